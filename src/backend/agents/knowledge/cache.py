@@ -0,0 +1,137 @@
+"""Semantic caches for the knowledge agent."""
+
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from cachetools import LRUCache
+
+from backend.config import settings
+
+
+class SemanticCache:
+    """LRU cache that matches entries by cosine similarity of their embeddings.
+
+    Cached embeddings are kept normalized in a fixed-size matrix so a lookup is a
+    single matrix-vector product. An evicted slot is overwritten by the entry
+    that replaces it; an expired slot is zeroed so it can no longer match.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        threshold: float = 0.95,
+        ttl: Optional[float] = None,
+    ):
+        """Initialize the SemanticCache.
+
+        Args:
+            maxsize: Maximum number of cached entries
+            threshold: Minimum cosine similarity for a cache hit
+            ttl: Seconds an entry stays valid, or None to keep it until evicted
+        """
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        # Monotonic time at which each entry in _slots expires, if ttl is set
+        self._deadlines: Dict[int, float] = {}
+        # Maps slot index -> cached value, ordered by recency
+        self._slots: LRUCache = LRUCache(maxsize=maxsize)
+        self._matrix: Optional[np.ndarray] = None
+        self._free: List[int] = list(range(maxsize - 1, -1, -1))
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self) -> None:
+        """Free the slots of entries older than the ttl."""
+        if self.ttl is None:
+            return
+
+        now = time.monotonic()
+        for slot in [slot for slot, end in self._deadlines.items() if end <= now]:
+            del self._deadlines[slot]
+            if slot in self._slots:
+                del self._slots[slot]
+                self._matrix[slot] = 0
+                self._free.append(slot)
+
+    def _match(self, vector: np.ndarray) -> Optional[int]:
+        """Return the live slot most similar to a normalized vector, if close enough."""
+        self._expire()
+        if self._matrix is None or not self._slots:
+            return None
+
+        similarities = self._matrix @ vector
+        slot = int(np.argmax(similarities))
+        if similarities[slot] < self.threshold or slot not in self._slots:
+            return None
+        return slot
+
+    def get(self, embedding: Sequence[float]) -> Optional[Any]:
+        """Return the value cached for the most similar embedding, if close enough.
+
+        Args:
+            embedding: Embedding of the lookup key
+
+        Returns:
+            The cached value, or None on a cache miss
+        """
+        slot = self._match(self._normalize(embedding))
+        if slot is None:
+            return None
+
+        # Reading through the LRUCache marks the slot as recently used
+        return self._slots[slot]
+
+    def put(self, embedding: Sequence[float], value: Any) -> None:
+        """Cache a value under the given embedding.
+
+        Replaces the entry that get would match for this embedding, if any, so
+        repeated puts don't leave stale duplicates that shadow the new value.
+
+        Args:
+            embedding: Embedding of the cache key
+            value: Value to cache
+        """
+        vector = self._normalize(embedding)
+        if self._matrix is None:
+            self._matrix = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+
+        slot = self._match(vector)
+        if slot is None:
+            if not self._free:
+                evicted, _ = self._slots.popitem()
+                self._free.append(evicted)
+            slot = self._free.pop()
+
+        self._matrix[slot] = vector
+        self._slots[slot] = value
+        if self.ttl is not None:
+            self._deadlines[slot] = time.monotonic() + self.ttl
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        self._slots.clear()
+        self._deadlines.clear()
+        self._matrix = None
+        self._free = list(range(self.maxsize - 1, -1, -1))
+
+
+# Refined queries keyed by the raw query and its conversation history
+refinement_cache = SemanticCache(
+    maxsize=settings.semantic_cache_size,
+    threshold=settings.semantic_cache_threshold,
+)
+
+# Retrieved documents keyed by the refined query. Writes through this process
+# clear it; the ttl bounds staleness after writes by the ingestion CLI, other
+# workers or other clients of a shared Chroma server, which it cannot observe.
+retrieval_cache = SemanticCache(
+    maxsize=settings.semantic_cache_size,
+    threshold=settings.semantic_cache_threshold,
+    ttl=settings.retrieval_cache_ttl,
+)
@@ -1,28 +1,70 @@
 """Modern, agentic knowledge graph that combines internal RAG with external search."""
 
-from typing import Any, Dict
-
+import asyncio
+import functools
+import logging
+import re
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
 from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
 from langgraph.graph import END, START, StateGraph
+from pydantic import ValidationError
 
+from backend.agents.knowledge.cache import refinement_cache
 from backend.agents.knowledge.prompts import (
     QUERY_REFINEMENT_PROMPT,
     DOCUMENT_EVALUATION_PROMPT,
 )
 from backend.agents.knowledge.schemas import (
     BinaryScore,
+    EvaluationSchema,
     KnowledgeOutputState,
     KnowledgeState,
 )
-from backend.agents.knowledge.tools import retrieve_context, tavily_search
+from backend.agents.knowledge.tools import (
+    get_embeddings,
+    get_tavily_search,
+    retrieve_context,
+)
 from backend.config import settings
 from backend.utils import format_conversation_history, get_recent_messages
 
-# Initialize model
-model = settings.get_model()
 
-# Define tools
-tools = [retrieve_context, tavily_search]
+# Models are created on first use rather than at import time
+@functools.cache
+def get_model() -> ChatOpenAI:
+    """Get the shared chat model."""
+    return settings.get_model()
+
+
+@functools.cache
+def get_evaluation_model() -> Runnable:
+    """Get the chat model bound to the document evaluation schema."""
+    return get_model().with_structured_output(
+        EvaluationSchema, method="function_calling", include_raw=True
+    )
+
+
+# Static prompt pieces, built once instead of on every invocation
+QUERY_REFINEMENT_MESSAGE = SystemMessage(content=QUERY_REFINEMENT_PROMPT)
+EVALUATION_PREFIX, _evaluation_rest = DOCUMENT_EVALUATION_PROMPT.split("{query}")
+EVALUATION_MIDDLE, EVALUATION_SUFFIX = _evaluation_rest.split("{context}")
+
+# Fallback parser for evaluation identifiers returned as labelled text
+RANK_ID_PATTERN = re.compile(r"\[(\d+)\]")
+
+# Characters of each document shown to the relevance grader
+SNIPPET_CHARS = 500
+
+# Below this many documents a plain sort is cheaper than the numpy round-trip
+ARGSORT_MIN_DOCS = 8
+
+# Bound concurrent Tavily requests across graph runs
+tavily_semaphore = asyncio.Semaphore(settings.tavily_max_concurrency)
 
 
 async def refine_query(state: KnowledgeState) -> Dict[str, Any]:
@@ -31,28 +73,38 @@ async def refine_query(state: KnowledgeState) -> Dict[str, Any]:
     if not state.messages:
         return {}
 
-    # Get the last human message as the query
-    last_human_message = next(
-        (
-            m
-            for m in reversed(state.messages)
-            if hasattr(m, "type") and m.type == "human"
-        ),
-        None,
-    )
+    # Get the last human message as the query, which is almost always the last one
+    last_message = state.messages[-1]
+    if last_message.type == "human":
+        last_human_message = last_message
+    else:
+        last_human_message = next(
+            (m for m in reversed(state.messages) if m.type == "human"), None
+        )
+
+    # Nothing to refine without a human message
+    if not last_human_message:
+        return {}
 
     # Extract the raw query
-    if last_human_message:
-        raw_query = last_human_message.content
+    raw_query = last_human_message.content
     # Get conversation history for context
     conversation_history = format_conversation_history(
         get_recent_messages(state.messages, exclude_last=True)
     )
 
+    # Reuse the refinement of a semantically equivalent query if cached
+    cache_embedding = await get_embeddings().aembed_query(
+        f"{conversation_history}\n{raw_query}"
+    )
+    cached_query = refinement_cache.get(cache_embedding)
+    if cached_query is not None:
+        return {"query": cached_query, "original_query": raw_query}
+
     # Optimize the query using the LLM
-    optimization_response = await model.ainvoke(
+    optimization_response = await get_model().ainvoke(
         [
-            SystemMessage(content=QUERY_REFINEMENT_PROMPT),
+            QUERY_REFINEMENT_MESSAGE,
             HumanMessage(
                 content=f"""
             Original query: {raw_query}
@@ -67,21 +119,77 @@ async def refine_query(state: KnowledgeState) -> Dict[str, Any]:
     )
 
     refined_query = optimization_response.content.strip()
+    refinement_cache.put(cache_embedding, refined_query)
 
     return {"query": refined_query, "original_query": raw_query}
 
 
-async def direct_retrieval(state: KnowledgeState) -> Dict[str, Any]:
-    """Directly retrieve documents from the knowledge base using the query."""
+async def refine_and_retrieve(state: KnowledgeState) -> Dict[str, Any]:
+    """Refine the query and retrieve documents from the knowledge base in one step."""
+    refinement = await refine_query(state)
+    query = refinement.get("query")
+
     # Skip if no query
-    if not state.query:
-        return {"internal_docs": [], "searched_internal": True}
+    if not query:
+        return {**refinement, "internal_docs": [], "searched_internal": True}
+
+    # Call the retrieve_context tool directly with the refined query
+    results = await retrieve_context.ainvoke({"query": query, "k": 5})
+
+    # Return the refined query along with the documents
+    return {**refinement, "internal_docs": results, "searched_internal": True}
+
+
+def parse_evaluation(result_text: str) -> Optional[EvaluationSchema]:
+    """Parse a document evaluation from raw JSON or labelled text."""
+    try:
+        return EvaluationSchema.model_validate_json(result_text)
+    except ValidationError:
+        pass
+
+    # Everything after ANALYSIS: is the analysis; the other labels precede it
+    head, _, analysis = result_text.partition("ANALYSIS:")
+    relevant = None
+    explanation = ""
+    ranking = []
+
+    for line in head.splitlines():
+        line = line.strip()
+        if line.startswith("RELEVANT:"):
+            relevant = "yes" if "yes" in line[len("RELEVANT:") :].lower() else "no"
+        elif line.startswith("EXPLANATION:"):
+            explanation = line[len("EXPLANATION:") :].strip()
+        elif line.startswith(("RANK:", "RANKING:")):
+            ranking = [int(i) for i in RANK_ID_PATTERN.findall(line)]
+
+    if relevant is None:
+        return None
+
+    return EvaluationSchema(
+        relevant=relevant,
+        explanation=explanation,
+        ranking=ranking,
+        analysis=analysis.strip(),
+    )
+
 
-    # Call the retrieve_context tool directly
-    results = await retrieve_context.ainvoke({"query": state.query, "k": 5})
+def rerank_documents(docs: List[Dict], ranking: List[int]) -> List[Dict]:
+    """Order documents by 1-based identifiers, keeping unranked ones at the end."""
+    order = []
+    for i in ranking:
+        if 1 <= i <= len(docs) and i - 1 not in order:
+            order.append(i - 1)
+    order.extend(i for i in range(len(docs)) if i not in order)
+    return [docs[i] for i in order]
 
-    # Return the documents
-    return {"internal_docs": results, "searched_internal": True}
+
+def reorder_for_context(items: List[Any]) -> List[Any]:
+    """Place the highest ranked items at both ends of the context.
+
+    Models attend least to the middle of long contexts, so ranks 1, 3, 5... go
+    first and ranks ...4, 2 go last.
+    """
+    return items[::2] + items[1::2][::-1]
 
 
 async def check_internal_docs(state: KnowledgeState) -> Dict[str, Any]:
@@ -94,149 +202,229 @@ async def check_internal_docs(state: KnowledgeState) -> Dict[str, Any]:
     docs = state.internal_docs
 
     # Extract document content
-    docs_text = []
-    for doc in docs:
-        if isinstance(doc, dict) and "content" in doc:
-            docs_text.append(doc["content"])
+    graded_docs = [doc for doc in docs if isinstance(doc, dict) and "content" in doc]
+    # The grader only judges relevance, so it sees a snippet of each document
+    docs_text = [
+        doc["content"][:SNIPPET_CHARS] + "..."
+        if len(doc["content"]) > SNIPPET_CHARS
+        else doc["content"]
+        for doc in graded_docs
+    ]
 
     # If no content or query, no point evaluating
     if not docs_text or not state.query:
         return {"docs_relevant": BinaryScore.NO, "searched_internal": True}
 
-    # Combine the documents into a single string
-    context = "\n\n---\n\n".join(docs_text)
+    # Skip the LLM grader when the similarity scores are decisive
+    top_score = max(doc.get("score", 0.0) for doc in graded_docs)
+    if top_score >= settings.relevance_high_threshold:
+        return {
+            "internal_docs": docs,
+            "docs_relevant": BinaryScore.YES,
+            "docs_grade_explanation": f"High similarity score {top_score:.2f}",
+            "docs_analysis": graded_docs[0]["content"][:2000],
+            "searched_internal": True,
+        }
+    if top_score < settings.relevance_low_threshold:
+        return {
+            "docs_relevant": BinaryScore.NO,
+            "docs_grade_explanation": f"Low similarity score {top_score:.2f}",
+            "searched_internal": True,
+        }
+
+    # Combine the documents into a single string, numbered for listwise ranking
+    context = "\n\n---\n\n".join(
+        f"[{i}] {text}" for i, text in enumerate(docs_text, 1)
+    )
 
     # Make a single LLM call to evaluate and analyze the documents
-    evaluation_result = await model.ainvoke(
+    evaluation_result = await get_evaluation_model().ainvoke(
         [
             SystemMessage(
-                content=DOCUMENT_EVALUATION_PROMPT.format(
-                    query=state.query, context=context
-                )
+                content=f"{EVALUATION_PREFIX}{state.query}{EVALUATION_MIDDLE}{context}{EVALUATION_SUFFIX}"
             )
         ]
     )
 
-    # Parse the structured response
-    result_text = evaluation_result.content.strip()
+    # Fall back to parsing the raw response if structured parsing failed
+    evaluation = evaluation_result["parsed"] or parse_evaluation(
+        evaluation_result["raw"].content
+    )
 
-    # Extract relevance, explanation and analysis from the structured output
+    # Default to not relevant if the response could not be parsed at all
     relevance = BinaryScore.NO
     explanation = "Documents do not contain relevant information."
     docs_analysis = "No relevant information found."
 
-    for line in result_text.split("\n"):
-        line = line.strip()
-        if line.startswith("RELEVANT:"):
-            relevance_text = line.replace("RELEVANT:", "").strip().lower()
-            relevance = BinaryScore.YES if "yes" in relevance_text else BinaryScore.NO
-        elif line.startswith("EXPLANATION:"):
-            explanation = line.replace("EXPLANATION:", "").strip()
-        elif line.startswith("ANALYSIS:"):
-            docs_analysis = line.replace("ANALYSIS:", "").strip()
+    reranked = False
 
-    # Get the rest of the analysis if it spans multiple lines
-    if "ANALYSIS:" in result_text:
-        analysis_parts = result_text.split("ANALYSIS:", 1)
-        if len(analysis_parts) > 1:
-            docs_analysis = analysis_parts[1].strip()
+    if evaluation:
+        relevance = evaluation.relevant
+        explanation = evaluation.explanation or explanation
+        docs_analysis = evaluation.analysis or docs_analysis
+        # Reorder the documents by the grader's ranking
+        if evaluation.ranking:
+            docs = rerank_documents(graded_docs, evaluation.ranking)
+            reranked = True
 
     return {
         "internal_docs": docs,
         "docs_relevant": relevance,
+        "docs_reranked": reranked,
         "docs_grade_explanation": explanation,
         "docs_analysis": docs_analysis,
         "searched_internal": True,
     }
 
 
-async def external_search_node(state: KnowledgeState) -> Dict[str, Any]:
-    """Search external sources for information."""
-    # Skip if we already have relevant internal docs
-    if state.docs_relevant == BinaryScore.YES:
-        return {}
+async def search_external(query: str) -> List[Dict]:
+    """Search external sources for information, bounded by the Tavily semaphore.
 
+    A slow or failing search yields no results rather than stalling the graph.
+    """
+    try:
+        async with asyncio.timeout(settings.tavily_timeout_s):
+            async with tavily_semaphore:
+                return await get_tavily_search().ainvoke({"query": query})
+    except TimeoutError:
+        logging.warning(
+            f"External search timed out after {settings.tavily_timeout_s}s: {query}"
+        )
+    except Exception as e:
+        logging.error(f"Error in external search: {e}", exc_info=True)
+    return []
+
+
+async def retrieve_and_search(state: KnowledgeState) -> Dict[str, Any]:
+    """Grade internal docs while speculatively searching external sources.
+
+    The web search only matters when the internal docs are graded irrelevant, so it
+    is started alongside the grading call and cancelled if the internal docs win.
+    Whichever source is used is formatted into the final knowledge findings.
+    """
     # Skip if we don't have a query
     if not state.query:
-        return {"external_results": [], "searched_external": True}
-
-    # Use the refined query for external search with proper input format
-    search_results = await tavily_search.ainvoke({"query": state.query})
-
-    # Return raw search results - prepare_output will handle formatting
-    return {"external_results": search_results, "searched_external": True}
-
-
-async def prepare_output(state: KnowledgeState) -> KnowledgeOutputState:
-    """Formats and prepares knowledge findings from either internal documents or external search results, sorting by relevance and combining into a structured output."""
-
-    # Initialize documents list and formatted text chunks
-    documents = []
-    formatted_text_chunks = []
-
-    # Only one of these conditions will ever be true based on the graph flow
-    # Process internal documents if they were relevant
-    if state.docs_relevant == BinaryScore.YES and state.internal_docs:
-        for i, doc in enumerate(state.internal_docs, 1):
-            # Create structured document
-            formatted_doc = {
-                "context": doc.get("content", ""),
-                "source_type": "internal",
-                "source": doc.get("metadata", {}).get("source", "Unknown"),
-                "score": doc.get("score", 0.0),
-            }
-            documents.append(formatted_doc)
-
-            # Format as text chunk for direct LLM consumption
-            source_name = doc.get("metadata", {}).get("source", "Unknown")
-            text_chunk = (
-                f"""Source {i} [Internal - {source_name}]: {doc.get('content', '')}"""
-            )
-            formatted_text_chunks.append(text_chunk)
-
-    # Process external results if internal search failed
-    elif state.external_results:
-        for i, result in enumerate(state.external_results, 1):
-            # Create structured document
-            formatted_doc = {
-                "context": result.get("content", ""),
-                "source_type": "external",
-                "title": result.get("title", "Unknown Title"),
-                "source": result.get("url", "Unknown URL"),
-                "score": result.get("score", 0.0),
-            }
-            documents.append(formatted_doc)
-
-            # Format as text chunk for direct LLM consumption
-            title = result.get("title", "Unknown Title")
-            url = result.get("url", "Unknown URL")
-            text_chunk = (
-                f"""Source {i} [Web - {title} ({url})]: {result.get('content', '')}"""
-            )
-            formatted_text_chunks.append(text_chunk)
-
-    # Sort documents by score (highest first)
-    if documents:
-        sorted_pairs = sorted(
-            zip(documents, formatted_text_chunks),
-            key=lambda pair: pair[0].get("score", 0),
-            reverse=True,
-        )
-        documents, formatted_text_chunks = zip(*sorted_pairs)
-        documents = list(documents)  # Convert back to list
-        formatted_text_chunks = list(formatted_text_chunks)  # Convert back to list
+        return {
+            "docs_relevant": BinaryScore.NO,
+            "external_results": [],
+            "searched_internal": True,
+            "searched_external": True,
+            "knowledge_findings": format_external_findings([]),
+        }
+
+    internal_task = asyncio.create_task(check_internal_docs(state))
+    external_task = asyncio.create_task(search_external(state.query))
+
+    try:
+        internal_result = await internal_task
+    except BaseException:
+        external_task.cancel()
+        raise
+
+    # Discard the web results if the internal docs are relevant
+    if internal_result.get("docs_relevant") == BinaryScore.YES:
+        external_task.cancel()
+        return {
+            **internal_result,
+            "knowledge_findings": format_internal_findings(
+                internal_result.get("internal_docs") or [],
+                reranked=internal_result.get("docs_reranked", False),
+            ),
+        }
+
+    external_results = await external_task
+    return {
+        **internal_result,
+        "external_results": external_results,
+        "searched_external": True,
+        "knowledge_findings": format_external_findings(external_results),
+    }
+
+
+def sort_by_score(
+    records: List[Tuple[float, Dict, str]],
+) -> List[Tuple[float, Dict, str]]:
+    """Sort (score, document, text chunk) records by score, highest first."""
+    if len(records) < ARGSORT_MIN_DOCS:
+        return sorted(records, key=itemgetter(0), reverse=True)
+
+    scores = np.fromiter(
+        (record[0] for record in records), dtype=np.float32, count=len(records)
+    )
+    # Stable sort keeps equal-score documents in their original order
+    return [records[i] for i in np.argsort(-scores, kind="stable")]
+
+
+def combine_findings(
+    records: List[Tuple[float, Dict, str]], reranked: bool = False
+) -> Dict[str, Any]:
+    """Combine (score, document, text chunk) records into knowledge findings."""
+    # Keep the grader's ranking when present, otherwise sort by score (highest first)
+    if not reranked and len(records) > 1:
+        records = sort_by_score(records)
+
+    documents = [record[1] for record in records]
+    formatted_text_chunks = [record[2] for record in records]
 
-    # Combine all text chunks into a single formatted context string
-    formatted_context = "\n\n".join(formatted_text_chunks)
+    # Place the best reranked docs at the context ends
+    if reranked:
+        formatted_text_chunks = reorder_for_context(formatted_text_chunks)
 
     # Create knowledge findings with exactly the format needed by the answer node
-    knowledge_findings = {
+    return {
         "documents": documents,
-        "formatted_context": formatted_context,
+        "formatted_context": "\n\n".join(formatted_text_chunks),
     }
 
-    # Return the knowledge_response with all formatted documents
-    return KnowledgeOutputState(knowledge_findings=knowledge_findings)
+
+def format_internal_findings(
+    docs: List[Dict], reranked: bool = False
+) -> Dict[str, Any]:
+    """Format relevant internal documents into knowledge findings."""
+    records = []
+    for i, doc in enumerate(docs, 1):
+        content = doc.get("content", "")
+        source_name = (doc.get("metadata") or {}).get("source", "Unknown")
+        score = doc.get("score", 0.0)
+
+        # Create structured document
+        formatted_doc = {
+            "context": content,
+            "source_type": "internal",
+            "source": source_name,
+            "score": score,
+        }
+
+        # Format as text chunk for direct LLM consumption
+        text_chunk = f"Source {i} [Internal - {source_name}]: {content}"
+        records.append((score, formatted_doc, text_chunk))
+
+    return combine_findings(records, reranked=reranked)
+
+
+def format_external_findings(results: List[Dict]) -> Dict[str, Any]:
+    """Format external search results into knowledge findings."""
+    records = []
+    for i, result in enumerate(results, 1):
+        content = result.get("content", "")
+        title = result.get("title", "Unknown Title")
+        url = result.get("url", "Unknown URL")
+        score = result.get("score", 0.0)
+
+        # Create structured document
+        formatted_doc = {
+            "context": content,
+            "source_type": "external",
+            "title": title,
+            "source": url,
+            "score": score,
+        }
+
+        # Format as text chunk for direct LLM consumption
+        text_chunk = f"Source {i} [Web - {title} ({url})]: {content}"
+        records.append((score, formatted_doc, text_chunk))
+
+    return combine_findings(records)
 
 
 # Create and connect the Knowledge graph
@@ -245,33 +433,15 @@ def create_knowledge_graph() -> StateGraph:
     workflow = StateGraph(KnowledgeState, output=KnowledgeOutputState)
 
     # Add all nodes
-    workflow.add_node("refine_query", refine_query)
-    workflow.add_node("retrieve", direct_retrieval)
-    workflow.add_node("check_internal", check_internal_docs)
-    workflow.add_node("external_search", external_search_node)
-    workflow.add_node("prepare_output", prepare_output)
-
-    # Define the streamlined flow - start with query refinement
-    workflow.add_edge(START, "refine_query")
-    workflow.add_edge("refine_query", "retrieve")
-
-    # After retrieval, check if docs are relevant
-    workflow.add_edge("retrieve", "check_internal")
-
-    # Simple conditional: check where to go after internal docs check
-    workflow.add_conditional_edges(
-        "check_internal",
-        lambda state: state.docs_relevant == BinaryScore.YES,
-        {
-            True: "prepare_output",  # If docs are relevant, go to output
-            False: "external_search",  # If not relevant, do external search
-        },
-    )
+    workflow.add_node("refine_and_retrieve", refine_and_retrieve)
+    workflow.add_node("retrieve_and_search", retrieve_and_search)
 
-    # External search goes to output preparation
-    workflow.add_edge("external_search", "prepare_output")
+    # Define the streamlined flow - start with query refinement and retrieval
+    workflow.add_edge(START, "refine_and_retrieve")
 
-    # Final node prepares output for orchestrator
-    workflow.add_edge("prepare_output", END)
+    # After retrieval, grade internal docs and search externally in parallel,
+    # producing the knowledge findings for the orchestrator
+    workflow.add_edge("refine_and_retrieve", "retrieve_and_search")
+    workflow.add_edge("retrieve_and_search", END)
 
     return workflow
@@ -16,11 +16,11 @@ Guidelines for optimization:
 Provide a concise, optimized version of the query that will help retrieve the most relevant information.
 Return ONLY the optimized query without explanation or commentary."""
 
-DOCUMENT_EVALUATION_PROMPT = """You are an expert document evaluator. Your task is to determine if the retrieved documents DIRECTLY answer the user's query AND provide a useful analysis if they do.
+DOCUMENT_EVALUATION_PROMPT = """You are an expert document evaluator. Your task is to determine if the retrieved documents DIRECTLY answer the user's query, rank them by relevance, AND provide a useful analysis if they do.
 
 User Query: {query}
 
-Retrieved Documents:
+Retrieved Documents (each prefixed with its identifier, e.g. [1]):
 
 ```markdown
 {context}
@@ -32,7 +32,9 @@ EVALUATION CRITERIA:
 3. SPECIFIC MATCH: Do the documents mention the exact entities, concepts, or technologies asked about?
 4. CURRENT RELEVANCE: Is the information up-to-date enough to be useful?
 
-Your response must follow this precise format:
-RELEVANT: [YES or NO]
-EXPLANATION: [Explain why the documents are relevant or not relevant]
-ANALYSIS: [If RELEVANT is YES, provide a detailed analysis of the key information in the documents that addresses the query. If RELEVANT is NO, write "No relevant information found."]"""
+Respond with a JSON object with these fields:
+- relevant: "yes" or "no"
+- explanation: why the documents are relevant or not relevant
+- ranking: the document identifiers ordered from most to least relevant to the query, e.g. [3, 1, 2]
+- analysis: if relevant is "yes", a detailed analysis of the key information in the documents that addresses the query; otherwise "No relevant information found."
+"""
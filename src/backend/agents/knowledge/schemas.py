@@ -1,12 +1,13 @@
 """Knowledge agent schemas for RAG system."""
 
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Annotated, Any, Dict, List, Optional, Sequence
 
+from langchain_core.messages import BaseMessage
+from langgraph.graph.message import add_messages
 from pydantic import BaseModel, Field
 
-from backend.agents.orchestrator.schemas import AgentState
-
 
 class BinaryScore(str, Enum):
     """Binary score for relevance check."""
@@ -15,25 +16,57 @@ class BinaryScore(str, Enum):
     NO = "no"
 
 
-class KnowledgeState(AgentState):
-    """State for the knowledge agent."""
+class EvaluationSchema(BaseModel):
+    """Structured output for document relevance evaluation."""
+
+    relevant: BinaryScore = Field(
+        description="Whether the documents directly answer the query"
+    )
+    explanation: str = Field(
+        description="Why the documents are relevant or not relevant"
+    )
+    ranking: List[int] = Field(
+        default_factory=list,
+        description="Document identifiers ordered from most to least relevant",
+    )
+    analysis: str = Field(
+        description="Key information addressing the query, or 'No relevant information found.'"
+    )
+
+
+@dataclass(kw_only=True, slots=True)
+class KnowledgeState:
+    """State for the knowledge agent.
+
+    A plain dataclass rather than a Pydantic model, so large retrieved documents
+    are not re-validated on every node transition.
+    """
+
+    # Conversation shared with the orchestrator
+    messages: Annotated[Sequence[BaseMessage], add_messages] = field(
+        default_factory=list
+    )
 
     # Query information
-    query: Optional[str] = Field(default=None)
-    original_query: Optional[str] = Field(default=None)
+    query: Optional[str] = None
+    original_query: Optional[str] = None
 
     # Document retrieval
-    internal_docs: Optional[List[Dict]] = Field(default=None)
-    docs_relevant: Optional[BinaryScore] = Field(default=None)
-    docs_grade_explanation: Optional[str] = Field(default=None)
-    docs_analysis: Optional[str] = Field(default=None)
+    internal_docs: Optional[List[Dict]] = None
+    docs_relevant: Optional[BinaryScore] = None
+    docs_reranked: bool = False
+    docs_grade_explanation: Optional[str] = None
+    docs_analysis: Optional[str] = None
 
     # External search results
-    external_results: Optional[List[Dict]] = Field(default=None)
+    external_results: Optional[List[Dict]] = None
 
     # Processing flags
-    searched_internal: bool = Field(default=False)
-    searched_external: bool = Field(default=False)
+    searched_internal: bool = False
+    searched_external: bool = False
+
+    # Formatted findings returned to the orchestrator
+    knowledge_findings: Optional[Dict[str, Any]] = None
 
 
 class KnowledgeOutputState(BaseModel):
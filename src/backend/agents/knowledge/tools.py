@@ -1,34 +1,55 @@
 """RAG tools for knowledge agent."""
 
-from typing import Dict, List, Optional
+import asyncio
+import functools
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
-from langchain_chroma import Chroma
 from langchain_core.tools import tool
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.tools import TavilySearchResults
+from langchain_openai import OpenAIEmbeddings
 from pydantic import BaseModel, Field
 
+from backend.agents.knowledge.cache import retrieval_cache
 from backend.config import settings
 
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+
 # Initialize components
-embeddings = settings.get_embeddings()
 text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
 
+# Metadata keys exposed in retrieval results
+SAFE_METADATA_KEYS = ("source", "path", "type", "extension")
+
 
 # Define a relevance score normalization function
-def normalize_score(score: float) -> float:
-    """Normalize the relevance score to be between 0 and 1."""
-    # Convert from [-1, 1] range to [0, 1] range
-    return max(0.0, min(1.0, (score + 1) / 2))
+def normalize_score(distance: float) -> float:
+    """Convert a Chroma distance into a relevance score between 0 and 1."""
+    # Chroma returns squared L2 distances, which lie in [0, 4] for the unit-length
+    # OpenAI embeddings, so cosine similarity is 1 - distance / 2. Map it from
+    # [-1, 1] to [0, 1] without clamping.
+    return 1.0 - distance * 0.25
+
+
+# Heavy components are created on first use rather than at import time
+@functools.cache
+def get_embeddings() -> OpenAIEmbeddings:
+    """Get the shared embeddings model."""
+    return settings.get_embeddings()
+
+
+@functools.cache
+def get_vectorstore() -> "Chroma":
+    """Get the shared vector store with the normalization function."""
+    return settings.get_vectorstore(
+        embedding_function=get_embeddings(), relevance_score_fn=normalize_score
+    )
 
 
-# Initialize vector store with the normalization function
-vectorstore = Chroma(
-    collection_name="rag_documents",
-    embedding_function=embeddings,
-    persist_directory=str(settings.chroma_path),
-    relevance_score_fn=normalize_score,
-)
+# Bound concurrent embedding calls and coalesce identical in-flight searches
+embedding_semaphore = asyncio.Semaphore(settings.embedding_max_concurrency)
+inflight_searches: Dict[Tuple[str, int], asyncio.Future] = {}
 
 
 # Input schemas
@@ -48,46 +69,90 @@ class QueryInput(BaseModel):
     )
 
 
-@tool("retrieve_context", args_schema=QueryInput)
-async def retrieve_context(query: str, k: int = 5) -> List[Dict]:
-    """Retrieve relevant documents from the knowledge base based on the query."""
+async def search_vectorstore(query: str, k: int) -> List[Dict]:
+    """Embed the query and search the vector store, using the semantic cache."""
     try:
-        # Search for relevant documents
-        results = await vectorstore.asimilarity_search_with_relevance_scores(query, k=k)
+        async with embedding_semaphore:
+            # Reuse the results of a semantically equivalent query if cached
+            query_embedding = await get_embeddings().aembed_query(query)
+            cached = retrieval_cache.get(query_embedding)
+            if cached is not None and cached[0] >= k:
+                return cached[1][:k]
+
+            # Search for relevant documents using the embedding computed above
+            results = await asyncio.to_thread(
+                get_vectorstore().similarity_search_by_vector_with_relevance_scores,
+                query_embedding,
+                k=k,
+            )
 
-        # Format results
+        # Format results, already ordered best match first by Chroma
         formatted_results = []
         for doc, score in results:
             # Extract safe metadata
-            metadata = {}
-            if doc.metadata:
-                for key in ["source", "path", "type", "extension"]:
-                    if key in doc.metadata:
-                        metadata[key] = str(doc.metadata[key])
+            doc_metadata = doc.metadata or {}
+            metadata = {
+                key: str(doc_metadata[key])
+                for key in SAFE_METADATA_KEYS
+                if key in doc_metadata
+            }
 
             # Add formatted result
             formatted_results.append(
                 {
                     "content": doc.page_content,
                     "metadata": metadata,
-                    "score": score,  # Score should already be normalized by Chroma
+                    "score": normalize_score(score),
                     "source": "internal",
                 }
             )
 
-        # Sort by score (highest first)
-        formatted_results.sort(key=lambda x: x["score"], reverse=True)
+        retrieval_cache.put(query_embedding, (k, formatted_results))
         return formatted_results
 
     except Exception as e:
         return [{"error": str(e), "source": "internal"}]
 
 
+@tool("retrieve_context", args_schema=QueryInput)
+async def retrieve_context(query: str, k: int = 5) -> List[Dict]:
+    """Retrieve relevant documents from the knowledge base based on the query."""
+    # Wait on an identical in-flight search instead of repeating it
+    key = (query, k)
+    pending = inflight_searches.get(key)
+    if pending is not None:
+        results = await asyncio.shield(pending)
+        # None means the owning search was cancelled, so run our own
+        if results is not None:
+            return results
+        return await search_vectorstore(query, k)
+
+    future = asyncio.get_running_loop().create_future()
+    inflight_searches[key] = future
+    try:
+        results = await search_vectorstore(query, k)
+    except asyncio.CancelledError:
+        # Only the owner was cancelled; don't cancel the runs waiting on it
+        future.set_result(None)
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(results)
+        return results
+    finally:
+        inflight_searches.pop(key, None)
+
+
 # Web search tool
-tavily_search = TavilySearchResults(
-    max_results=5,
-    search_depth="advanced",
-    include_raw_content=True,
-    include_answer=True,
-    tavily_api_key=settings.tavily_api_key,
-)
+@functools.cache
+def get_tavily_search() -> TavilySearchResults:
+    """Get the shared web search tool."""
+    return TavilySearchResults(
+        max_results=5,
+        search_depth="advanced",
+        include_raw_content=True,
+        include_answer=True,
+        tavily_api_key=settings.tavily_api_key,
+    )
@@ -1,8 +1,10 @@
 """Main graph builder that compiles all sub-graphs."""
 
 import logging
-from typing import Any, Literal
+import re
+from typing import Any, Literal, Optional
 
+from cachetools import LRUCache
 from langchain_core.messages import (
     AIMessage,
     HumanMessage,
@@ -16,23 +18,71 @@ from backend.agents.orchestrator.prompts import ANSWER_PROMPT, ROUTER_SYSTEM_PRO
 from backend.agents.orchestrator.schemas import (
     AgentState,
     AnswerReturn,
+    RouteDecision,
     SummaryReturn,
 )
 from backend.agents.knowledge.graph import create_knowledge_graph
 from backend.agents.summarizer.graph import create_summarizer_graph
+from backend.agents.summarizer.schemas import SummarizerResponse
 from backend.config import settings
 
-# Initialize model for routing and summarization using shared configuration
+# Initialize model for summarization and answers using shared configuration
 model = settings.get_model()
 
+# Routing is a three-way classification, so use the small model with a fixed schema
+router_model = settings.get_router_model().with_structured_output(
+    RouteDecision, method="function_calling"
+)
+
+
+# Routing decisions keyed by the recent conversation context
+routing_cache: LRUCache = LRUCache(maxsize=512)
+
+# Deterministic routes for obvious intents
+FAST_ROUTES = [
+    (re.compile(r"^\s*(summari[sz]e|tl;?dr)\b", re.IGNORECASE), "SUMMARIZE"),
+    (
+        re.compile(
+            r"^\s*(hi|hello|hey|thanks|thank you)( there| so much| a lot)?[\s!.,]*$",
+            re.IGNORECASE,
+        ),
+        "ANSWER",
+    ),
+]
+
+
+def get_fast_route(text: Any) -> Optional[str]:
+    """Return the route for messages with an obvious intent, if any."""
+    if not isinstance(text, str):
+        return None
+    for pattern, route in FAST_ROUTES:
+        if pattern.match(text):
+            return route
+    return None
+
+
+# Route label following the "[Selected Route]" header of a routing decision
+ROUTE_PATTERN = re.compile(r"\[Selected Route\][^\n]*\n\s*(\w+)", re.IGNORECASE)
+
+
+def format_routing_decision(route: str, reasoning: str) -> str:
+    """Render a route in the routing decision format read by parse_route."""
+    return f"[Selected Route]\n{route}\n\n[Reasoning]\n{reasoning}"
+
+
+def parse_route(routing_decision: str) -> str:
+    """Extract the upper-cased route from a routing decision, or "" if missing."""
+    match = ROUTE_PATTERN.search(routing_decision)
+    return match.group(1).upper() if match else ""
+
 
 # Node functions
 
 
 async def summarize_conversation(state: AgentState) -> SummaryReturn:
     """Summarize older messages while keeping recent context."""
-    messages = state.messages
-    summary = state.summary
+    messages = state["messages"]
+    summary = state.get("summary")
 
     # Create summarization prompt
     if summary:
@@ -67,7 +117,7 @@ async def route_message(
     state: AgentState,
 ) -> Command[Literal["answer", "knowledge", "document_summarizer"]]:
     """Router that decides if we need to delegate to specialized agents."""
-    messages = state.messages
+    messages = state["messages"]
     if not messages:
         return Command(
             goto="knowledge",
@@ -91,29 +141,48 @@ async def route_message(
             },
         )
 
-    # Get recent context for LLM-based routing if prefix not found
-    recent_messages = messages[-3:] if len(messages) > 3 else messages
-    recent_content = "\n".join(
-        [f"{msg.__class__.__name__}: {msg.content}" for msg in recent_messages]
-    )
-
-    # Get routing decision
-    response = await model.ainvoke(
-        [
-            SystemMessage(content=ROUTER_SYSTEM_PROMPT.format(context=recent_content)),
-            HumanMessage(
-                content=messages[-1].content
-            ),  # Route based on last message with context
-        ]
-    )
-
-    # Get the route from the response
-    try:
-        next_step_str = (
-            response.content.split("[Selected Route]")[1].split("\n")[1].strip().upper()
+    # Route obvious intents without calling the LLM
+    fast_route = get_fast_route(last_message_content)
+    if fast_route:
+        routing_decision = format_routing_decision(
+            fast_route, "Matched a deterministic routing pattern"
         )
-    except Exception:
-        next_step_str = "KNOWLEDGE"  # Default to knowledge on parsing error
+    else:
+        # Get recent context for LLM-based routing if prefix not found
+        recent_messages = messages[-3:] if len(messages) > 3 else messages
+        parts = []
+        append = parts.append
+        for msg in recent_messages:
+            append(type(msg).__name__)
+            append(": ")
+            append(str(msg.content))
+            append("\n")
+        recent_content = "".join(parts)[:-1]
+
+        # Reuse the decision for an identical routing input
+        cache_key = recent_content if len(recent_content) <= 2048 else None
+        routing_decision = routing_cache.get(cache_key) if cache_key else None
+
+        if routing_decision is None:
+            # Get routing decision
+            decision = await router_model.ainvoke(
+                [
+                    SystemMessage(
+                        content=ROUTER_SYSTEM_PROMPT.format(context=recent_content)
+                    ),
+                    HumanMessage(
+                        content=messages[-1].content
+                    ),  # Route based on last message with context
+                ]
+            )
+            routing_decision = format_routing_decision(
+                decision.route, decision.reasoning
+            )
+            if cache_key:
+                routing_cache[cache_key] = routing_decision
+
+    # Get the route from the decision, defaulting to knowledge on parsing error
+    next_step_str = parse_route(routing_decision) or "KNOWLEDGE"
 
     # Map to valid next steps
     route_mapping = {
@@ -126,7 +195,7 @@ async def route_message(
     next_node_name = route_mapping.get(next_step_str, "knowledge")
 
     # Return Command to transition and update state
-    return Command(goto=next_node_name, update={"routing_decision": response.content})
+    return Command(goto=next_node_name, update={"routing_decision": routing_decision})
 
 
 # Edge conditions
@@ -134,7 +203,7 @@ async def route_message(
 
 def should_summarize_conversation(state: AgentState) -> bool:
     """Check if we should summarize the conversation."""
-    messages = state.messages
+    messages = state["messages"]
 
     # First check message count - summarize if more than threshold
     if len(messages) > 10:  # Only summarize after 10 messages
@@ -146,38 +215,28 @@ def should_summarize_conversation(state: AgentState) -> bool:
 
 async def answer(state: AgentState) -> AnswerReturn:
     """Generate a direct answer to the user's question from conversation context."""
-    messages = state.messages
-    routing_decision = state.routing_decision
+    messages = state["messages"]
+    routing_decision = state.get("routing_decision")
 
     try:
         # Determine which agent output we're using (if any)
-        route = ""
-        if routing_decision:
-            try:
-                route = (
-                    routing_decision.split("[Selected Route]")[1]
-                    .split("\n")[1]
-                    .strip()
-                    .upper()
-                )
-            except Exception:
-                route = ""
+        route = parse_route(routing_decision) if routing_decision else ""
 
         # Prepare the context for the answer based on available agent outputs
         context = ""
 
-        # Case 1: Knowledge agent output
-        if route == "KNOWLEDGE" and state.knowledge_findings:
-            knowledge_data = state.knowledge_findings
+        knowledge_data = state.get("knowledge_findings")
+        summarizer_data = state.get("summarizer_response")
 
+        # Case 1: Knowledge agent output
+        if route == "KNOWLEDGE" and knowledge_data:
             # Use the pre-formatted context if available
             if "formatted_context" in knowledge_data:
                 formatted_context = knowledge_data.get("formatted_context", "")
                 context = f"Context from Knowledge Agent:\n{formatted_context}\n"
 
         # Case 2: Summarizer agent output (from document_summarizer node)
-        elif route == "SUMMARIZE" and state.summarizer_response:
-            summarizer_data = state.summarizer_response
+        elif route == "SUMMARIZE" and summarizer_data:
             formatted_summaries = ""
             num_chunks_processed = 0
             if isinstance(summarizer_data, dict):
@@ -185,15 +244,9 @@ async def answer(state: AgentState) -> AnswerReturn:
                     "formatted_chunk_summaries", "Summaries not available."
                 )
                 num_chunks_processed = summarizer_data.get("num_chunks", 0)
-            elif hasattr(
-                summarizer_data, "formatted_chunk_summaries"
-            ):  # Check if it's an object with attributes
-                formatted_summaries = getattr(
-                    summarizer_data,
-                    "formatted_chunk_summaries",
-                    "Summaries not available.",
-                )
-                num_chunks_processed = getattr(summarizer_data, "num_chunks", 0)
+            elif isinstance(summarizer_data, SummarizerResponse):
+                formatted_summaries = summarizer_data.formatted_chunk_summaries
+                num_chunks_processed = summarizer_data.num_chunks
 
             # Use the formatted chunk summaries as context for the answer node
             context = f"Individual Chunk Summaries:\n{formatted_summaries}\n(Processed {num_chunks_processed} chunks)\n"
@@ -1,92 +1,18 @@
 """Prompts for all agents in the system."""
 
-ROUTER_SYSTEM_PROMPT = """You are a smart routing agent that decides the next step in a conversation.
+ROUTER_SYSTEM_PROMPT = """You are a routing agent. Pick the next step for the latest user message.
 
-Available Routes:
-ANSWER: For system-related queries and basic interactions
-- System capabilities and features
-- Greetings, thanks, and basic acknowledgments
-- Clarifying questions about the conversation
-- Questions about how to use the system
+Routes:
+ANSWER: greetings, thanks, acknowledgments, clarifying questions about the conversation, and questions about the system or how to use it.
+KNOWLEDGE: information queries on internal documents or code, technical topics, history, general knowledge, web research and facts. Also use it when the user shares a document or asks to process a file.
+SUMMARIZE: explicit requests to summarize, condense or extract key points from a text.
 
-KNOWLEDGE: For information queries (both internal documents and external research)
-- Questions about specific documents or code in the system
-- Queries requiring context from internal documents
-- Questions about technical topics, history, or general knowledge
-- Research questions requiring web lookup or Wikipedia information
-- Factual questions about the world
-
-SUMMARIZE: For document summarization requests
-- Requests to summarize long documents
-- Requests to create concise versions of text
-- Requests to extract key points from content
-- Processing large text for summary generation
-
-Note: When user shares a document or asks to process a file, always route to KNOWLEDGE.
-When user specifically asks for summarization, route to SUMMARIZE.
-
-Examples of summarization requests:
-- "Can you summarize this article for me?"
-- "Give me a summary of this text"
-- "What are the key points from this document?"
-- "Create a concise version of this"
-
-Note: Simple acknowledgments and thanks should go to ANSWER route.
+Example: "Can you summarize this article for me?" -> SUMMARIZE
 
 Recent conversation context:
 {context}
 
-Think through these steps:
-1. Thought: Analyze the current conversation flow and latest query
-2. Analysis: Consider conversation history and current needs
-3. Action: Select the most appropriate route based on full context
-
-Example flows:
-Input: "What are your capabilities?"
-Context: (New conversation)
-Thought: User is starting conversation with system query
-Analysis: Direct system question with no prior context
-Action: ANSWER
-
-Input: "Can you summarize this article for me?"
-Context: (User provides a long article)
-Thought: User wants document summarization
-Analysis: Need to process and summarize long content
-Action: SUMMARIZE
-
-Input: "What ML framework is best for NLP?"
-Context: (No previous messages)
-Thought: User wants information about machine learning frameworks for NLP
-Analysis: This requires knowledge retrieval and comparison of technologies
-Action: KNOWLEDGE
-
-Input: "Can you find information about TensorFlow?"
-Context: (Previous message about machine learning)
-Thought: User wants specific information about a technology
-Analysis: Requires knowledge retrieval about TensorFlow
-Action: KNOWLEDGE
-
-Input: "Thanks, that helps!"
-Context: (After receiving detailed explanation)
-Thought: User expressing gratitude, needs acknowledgment
-Analysis: Basic interaction needed
-Action: ANSWER
-
-Format your response as:
-[Thought Process]
-<your analysis of the conversation>
-
-[Analysis]
-<why certain capabilities are needed>
-
-[Selected Route]
-ANSWER/KNOWLEDGE/SUMMARIZE
-
-[Confidence]
-Score: 0-1
-
-[Reasoning]
-One line explanation"""
+Reply with the route and a one line reason."""
 
 
 ANSWER_PROMPT = """You are the final response generator for a multi-agent system. Your task is to deliver a clear, helpful answer to the user based on the conversation history and context provided.
@@ -1,24 +1,34 @@
 """Core schemas for agent system."""
 
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Literal, Optional, Union
 
 from langchain_core.messages import BaseMessage
-from langgraph.prebuilt.chat_agent_executor import AgentStatePydantic
+from langgraph.prebuilt.chat_agent_executor import AgentState as BaseAgentState
 from pydantic import BaseModel, Field
 
 
 # Agent State
-class AgentState(AgentStatePydantic):
+class AgentState(BaseAgentState, total=False):
     """Base state for all agents."""
 
     # Common state
-    summary: Optional[str] = None
-    routing_decision: Optional[str] = None
+    summary: Optional[str]
+    routing_decision: Optional[str]
 
     # Agent-specific state - only one will be populated based on routing
-    knowledge_findings: Optional[Dict[str, Any]] = None
-    summarizer_response: Optional[Union[Dict[str, Any], Any]] = None
-    document_content: Optional[str] = None
+    knowledge_findings: Optional[Dict[str, Any]]
+    summarizer_response: Optional[Union[Dict[str, Any], Any]]
+    document_content: Optional[str]
+
+
+# Structured router output
+class RouteDecision(BaseModel):
+    """Routing decision for the latest user message."""
+
+    route: Literal["ANSWER", "KNOWLEDGE", "SUMMARIZE"] = Field(
+        description="Next step for the conversation"
+    )
+    reasoning: str = Field(description="One line explanation")
 
 
 # Node Return Types
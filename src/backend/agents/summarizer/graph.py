@@ -1,36 +1,77 @@
 """Summarizer agent graph definition."""
 
-from typing import Any, Dict, List, Optional
+import asyncio
+import re
+from typing import Dict, List, Optional, Tuple
 
-from langchain_core.messages import SystemMessage
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langgraph.config import get_stream_writer
 from langgraph.graph import END, START, StateGraph
-from langgraph.types import Send
 
 from backend.agents.summarizer.schemas import (
     ChunkSizeRecommendation,
-    ChunkState,
     ProcessDocumentNodeOutput,
     SummarizerOutput,
     SummarizerState,
 )
 from backend.agents.summarizer.prompts import (
     CHUNK_SIZE_PROMPT,
-    CHUNK_SUMMARY_PROMPT,
+    CHUNK_SUMMARY_SYSTEM,
+    format_chunk_prompt,
 )
 from backend.agents.summarizer.tools import chunk_document
 from backend.config import settings
-from backend.utils.file_utils import count_tokens
+from backend.utils.file_utils import OFFLOAD_THRESHOLD_CHARS, count_tokens
+from backend.utils.profiling import timed_node
 
-# Initialize model using shared configuration
-model = settings.get_model()
+# Initialize model using shared configuration. stream_usage is needed for
+# streamed calls to report the token counts recorded by timed_node.
+model = settings.get_model(stream_usage=True)
+
+# Shared by every chunk summary request
+_SYS_MSG = SystemMessage(content=CHUNK_SUMMARY_SYSTEM)
+
+# Caps in-flight chunk summary requests across all documents being summarized
+_LLM_SEM = asyncio.Semaphore(settings.summarizer_max_concurrency)
+
+
+# Chunk sizes in tokens by document size, smallest first
+CHUNK_SIZE_TABLE = ((4_000, 800), (32_000, 1500))
+DEFAULT_CHUNK_SIZE = 2000
+
+# Markdown header (1-6 "#" and a space) at the start of a line
+_HEADER_RE = re.compile(r"(?m)^#{1,6} ")
+
+# Documents below this many tokens are summarized as a single chunk
+SMALL_DOCUMENT_TOKENS = 1200
+
+
+def _recommend_chunking(document: str, total_tokens: int) -> Tuple[int, int]:
+    """Pick chunk size and overlap from the document size.
+
+    Args:
+        document: The document text
+        total_tokens: Number of tokens in the document
+
+    Returns:
+        Tuple of (chunk_size, chunk_overlap), clamped to the chunk_document bounds
+    """
+    chunk_size = next(
+        (size for limit, size in CHUNK_SIZE_TABLE if total_tokens < limit),
+        DEFAULT_CHUNK_SIZE,
+    )
+    chunk_overlap = chunk_size // 10
+    return min(max(chunk_size, 100), 4000), min(max(chunk_overlap, 20), 500)
 
 
 # Node functions
-async def analyze_document_structure(document: str) -> Dict[str, int]:
+async def analyze_document_structure(
+    document: str, total_tokens: int, header_offsets: List[int]
+) -> Dict[str, int]:
     """Analyze document structure and recommend chunk settings."""
-    # Get document preview and stats
-    preview = document[:500]
-    total_tokens = await count_tokens(document)
+    if not settings.summarizer_llm_chunking:
+        chunk_size, chunk_overlap = _recommend_chunking(document, total_tokens)
+        return {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
 
     # Get recommendation from LLM using function calling
     recommendation = await model.with_structured_output(
@@ -39,11 +80,10 @@ async def analyze_document_structure(document: str) -> Dict[str, int]:
         [
             SystemMessage(
                 content=CHUNK_SIZE_PROMPT.format(
-                    document_preview=preview,
                     metadata={
                         "total_tokens": total_tokens,
                         "total_length": len(document),
-                        "has_headers": "##" in document or "#" in document,
+                        "has_headers": bool(header_offsets),
                     },
                 )
             )
@@ -56,13 +96,16 @@ async def analyze_document_structure(document: str) -> Dict[str, int]:
     }
 
 
-async def process_document_node(state: SummarizerState) -> Dict[str, Any]:
+@timed_node
+async def process_document_node(
+    state: SummarizerState,
+) -> ProcessDocumentNodeOutput:
     """
     Node to process and chunk an input document.
     It expects the document text to be already populated in the state.
     """
-    doc_content_from_orchestrator = getattr(state, "document_content", None)
-    doc_content_from_input = getattr(state, "input_document_content", None)
+    doc_content_from_orchestrator = state.get("document_content")
+    doc_content_from_input = state.get("input_document_content")
 
     document_to_process: Optional[str] = None
     error_source_field = ""
@@ -80,63 +123,109 @@ async def process_document_node(state: SummarizerState) -> Dict[str, Any]:
             "'document_content' and 'input_document_content'. "
             "Content must be provided in one of these fields."
         )
-        return ProcessDocumentNodeOutput(
-            document="",
-            chunks=[],
-            summaries=[],
-            final_summary=final_summary_update,
-        ).model_dump(exclude_none=True)
+        return {
+            "document": "",
+            "chunks": [],
+            "summaries": [],
+            "final_summary": final_summary_update,
+        }
 
     try:
-        chunk_settings = await analyze_document_structure(document_to_process)
+        if len(document_to_process) > OFFLOAD_THRESHOLD_CHARS:
+            total_tokens = await asyncio.to_thread(count_tokens, document_to_process)
+        else:
+            total_tokens = count_tokens(document_to_process)
+
+        # A document smaller than one chunk needs no analysis or splitting
+        if total_tokens < SMALL_DOCUMENT_TOKENS:
+            return {
+                "document": document_to_process,
+                "chunks": [document_to_process],
+                "summaries": [],
+            }
+
+        # Scan for headers once; used by both the recommender and the splitter
+        header_offsets = [m.start() for m in _HEADER_RE.finditer(document_to_process)]
+        chunk_settings = await analyze_document_structure(
+            document_to_process, total_tokens, header_offsets
+        )
         chunk_result = await chunk_document.ainvoke(
             {
                 "text": document_to_process,
                 "chunk_size": chunk_settings["chunk_size"],
                 "chunk_overlap": chunk_settings["chunk_overlap"],
+                "header_offsets": header_offsets,
             }
         )
     except Exception as e:
-        return ProcessDocumentNodeOutput(
-            document=document_to_process,
-            chunks=[],
-            summaries=[],
-            final_summary=f"Error during document analysis or chunking: {str(e)}",
-        ).model_dump(exclude_none=True)
+        return {
+            "document": document_to_process,
+            "chunks": [],
+            "summaries": [],
+            "final_summary": f"Error during document analysis or chunking: {str(e)}",
+        }
 
     if "error" in chunk_result or not chunk_result.get("chunks"):
         error_message = chunk_result.get(
             "error", "No chunks produced or an unspecified error occurred."
         )
-        return ProcessDocumentNodeOutput(
-            document=document_to_process,
-            chunks=[],
-            summaries=[],
-            final_summary=f"Error chunking document (source: {error_source_field}): {error_message}",
-        ).model_dump(exclude_none=True)
-
-    return ProcessDocumentNodeOutput(
-        document=document_to_process,
-        chunks=chunk_result["chunks"],
-        summaries=[],
-        final_summary=None,
-    ).model_dump(exclude_none=True)
-
-
-async def summarize_chunk(state: ChunkState) -> Dict[str, List[str]]:
-    """Node to summarize an individual chunk."""
-    chunk = state.chunk
-    chunk_id = state.chunk_id
-
-    response = await model.ainvoke(
-        [SystemMessage(content=CHUNK_SUMMARY_PROMPT.format(chunk=chunk))]
-    )
-    return {"summaries": [f"[Chunk {chunk_id}] {response.content}"]}
+        return {
+            "document": document_to_process,
+            "chunks": [],
+            "summaries": [],
+            "final_summary": f"Error chunking document (source: {error_source_field}): {error_message}",
+        }
 
+    return {
+        "document": document_to_process,
+        "chunks": chunk_result["chunks"],
+        "summaries": [],
+    }
+
+
+@timed_node
+async def summarize_all_chunks(state: SummarizerState) -> Dict[str, List[str]]:
+    """Node to summarize all chunks concurrently, bounded by _LLM_SEM.
+
+    Each summary is also emitted on the custom stream as soon as it completes,
+    so clients streaming with stream_mode="custom" can render it early.
+    """
+    prompts = [
+        [_SYS_MSG, HumanMessage(content=format_chunk_prompt(chunk))]
+        for chunk in state.get("chunks", [])
+    ]
+    if not prompts:
+        return {"summaries": []}
+
+    async def summarize(i: int, prompt: List[BaseMessage]) -> Tuple[int, str]:
+        async with _LLM_SEM:
+            response = await model.ainvoke(prompt)
+        return i, response.content
+
+    writer = get_stream_writer()
+    summaries: List[str] = [""] * len(prompts)
+    tasks = [
+        asyncio.create_task(summarize(i, prompt)) for i, prompt in enumerate(prompts)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            i, content = await next_done
+            summaries[i] = f"[Chunk {i}] {content}"
+            writer({"chunk_summary": {"chunk_id": i, "summary": summaries[i]}})
+    finally:
+        # On failure, stop the remaining calls rather than leaving them running
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
+    # Flush once, in chunk order
+    return {"summaries": summaries}
+
+
+@timed_node
 async def combine_summaries(state: SummarizerState) -> SummarizerOutput:
     """Node to combine all chunk summaries into a single formatted string."""
-    summaries = state.summaries if hasattr(state, "summaries") else []
+    summaries = state.get("summaries", [])
 
     # Format the individual chunk summaries into a single string
     formatted_summaries_string = (
@@ -160,19 +249,6 @@ async def combine_summaries(state: SummarizerState) -> SummarizerOutput:
     return SummarizerOutput(summarizer_response=result_data)
 
 
-# Edge functions
-def distribute_chunks(state: SummarizerState) -> List[Send]:
-    """Creates Send objects for each chunk to be processed in parallel."""
-    chunks = state.chunks if hasattr(state, "chunks") else []
-    if not chunks:
-        return []
-
-    return [
-        Send("summarize_chunk", ChunkState(chunk=chunk, chunk_id=i))
-        for i, chunk in enumerate(chunks)
-    ]
-
-
 # Create the graph
 def create_summarizer_graph() -> StateGraph:
     """Create the summarizer workflow graph."""
@@ -183,7 +259,7 @@ def create_summarizer_graph() -> StateGraph:
 
     # Add nodes
     workflow.add_node("process_document", process_document_node)
-    workflow.add_node("summarize_chunk", summarize_chunk)
+    workflow.add_node("summarize_all_chunks", summarize_all_chunks)
     workflow.add_node(
         "combine_summaries", combine_summaries
     )  # This node now formats the output
@@ -191,14 +267,9 @@ def create_summarizer_graph() -> StateGraph:
     # Add edges
     workflow.add_edge(START, "process_document")
 
-    # Add conditional edges for parallel processing
-    workflow.add_conditional_edges(
-        "process_document", distribute_chunks, ["summarize_chunk"]
-    )
-
-    # Connect summarize_chunk to combine_summaries
-    # All parallel summarize_chunk nodes will feed into combine_summaries
-    workflow.add_edge("summarize_chunk", "combine_summaries")
+    # Summarize every chunk in one batched call
+    workflow.add_edge("process_document", "summarize_all_chunks")
+    workflow.add_edge("summarize_all_chunks", "combine_summaries")
 
     # After combining summaries, the subgraph finishes
     workflow.add_edge("combine_summaries", END)
@@ -1,6 +1,7 @@
 """Prompts for the summarizer agent."""
 
-CHUNK_SUMMARY_PROMPT = """You are a precise document summarizer. Your task is to create a clear, concise summary of the following text chunk.
+# Static instructions, kept separate from the chunk so the prefix can be cached
+CHUNK_SUMMARY_SYSTEM = """You are a precise document summarizer. Your task is to create a clear, concise summary of the text chunk you are given.
 Focus on key information, main ideas, and important details. Maintain factual accuracy and context.
 
 Remember:
@@ -9,21 +10,27 @@ Remember:
 - Maintain the original meaning and context
 - Be concise but comprehensive
 - Use clear, professional language
+"""
 
-Text chunk to summarize:
+CHUNK_SUMMARY_PROMPT = """Text chunk to summarize:
 {chunk}
 """
 
-CHUNK_SIZE_PROMPT = """Analyze the following document and recommend an optimal chunk size for splitting it into manageable pieces.
+_CSP_PREFIX, _CSP_SUFFIX = CHUNK_SUMMARY_PROMPT.split("{chunk}")
+
+
+def format_chunk_prompt(chunk: str) -> str:
+    """Fill CHUNK_SUMMARY_PROMPT by concatenation instead of str.format."""
+    return _CSP_PREFIX + chunk + _CSP_SUFFIX
+
+
+CHUNK_SIZE_PROMPT = """Using the document metadata below, recommend an optimal chunk size for splitting it into manageable pieces.
 Consider:
 - Document length and complexity
 - Natural section breaks
 - Context preservation
 - Typical LLM context window limitations
 
-Document preview (first 500 chars):
-"{document_preview}..."
-
 Document metadata:
 {metadata}
 
@@ -1,6 +1,6 @@
 """Schemas for the summarizer agent."""
 
-from typing import Annotated, Any, Dict, List, Optional
+from typing import Annotated, Any, Dict, List, Optional, TypedDict
 
 import operator
 
@@ -21,48 +21,31 @@ class ChunkSizeRecommendation(BaseModel):
     reasoning: str = Field(description="Brief explanation for the recommendation")
 
 
-# State for processing individual document chunks
-class ChunkState(BaseModel):
-    """State for processing individual document chunks."""
-
-    chunk: str
-    chunk_id: int
-
-
 # Main state for the summarizer agent
-class SummarizerState(AgentState):
+class SummarizerState(AgentState, total=False):
     """Main state for the summarizer agent."""
 
-    input_document_content: Optional[str] = Field(
-        default=None,
-        description="Pre-processed text content of the document to be summarized",
-    )
-    document: str = Field(
-        default="",
-        description="Original document processed by the node (can be same as input_document_content or derived)",
-    )
-    chunks: List[str] = Field(
-        default_factory=list, description="Document split into chunks"
-    )
-    summaries: Annotated[List[str], operator.add] = Field(
-        default_factory=list,
-        description="Individual chunk summaries (uses add reducer)",
-    )
-    final_summary: Optional[str] = Field(
-        default=None, description="Final combined summary"
-    )
+    # Pre-processed text content of the document to be summarized
+    input_document_content: Optional[str]
+    # Original document processed by the node (can be same as input_document_content or derived)
+    document: str
+    # Document split into chunks
+    chunks: List[str]
+    # Individual chunk summaries. operator.add builds a new list rather than
+    # extending the one still held by the previous checkpoint.
+    summaries: Annotated[List[str], operator.add]
+    # Final combined summary
+    final_summary: Optional[str]
 
 
 # Schema for the output of process_document_node (partial update for SummarizerState)
-class ProcessDocumentNodeOutput(BaseModel):
+class ProcessDocumentNodeOutput(TypedDict, total=False):
     """Defines the structure of the dictionary returned by process_document_node."""
 
-    document: Optional[str] = None
-    chunks: Optional[List[str]] = None
-    summaries: Optional[List[str]] = (
-        None  # Though typically initialized empty by this node
-    )
-    final_summary: Optional[str] = None
+    document: str
+    chunks: List[str]
+    summaries: List[str]  # Though typically initialized empty by this node
+    final_summary: str
 
 
 # Response from the summarizer agent
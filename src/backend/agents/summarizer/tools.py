@@ -1,11 +1,12 @@
 """Summarizer agent tools."""
 
-from typing import Any, Dict
+import asyncio
+from typing import Any, Dict, List, Optional
 
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
 
-from backend.utils.file_utils import count_tokens, create_chunks
+from backend.utils.file_utils import OFFLOAD_THRESHOLD_CHARS, create_chunks_with_stats
 
 
 # Define input schemas
@@ -25,11 +26,18 @@ class ChunkDocumentInput(BaseModel):
         ge=20,
         le=500,
     )
+    header_offsets: Optional[List[int]] = Field(
+        default=None,
+        description="Character offsets of markdown headers to prefer as chunk boundaries",
+    )
 
 
 @tool("chunk_document", args_schema=ChunkDocumentInput)
 async def chunk_document(
-    text: str, chunk_size: int = 500, chunk_overlap: int = 50
+    text: str,
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    header_offsets: Optional[List[int]] = None,
 ) -> Dict[str, Any]:
     """Split a document into chunks while preserving context and sentence boundaries.
 
@@ -37,6 +45,7 @@ async def chunk_document(
         text: The document text to split
         chunk_size: Target size for each chunk in tokens
         chunk_overlap: Number of tokens to overlap between chunks
+        header_offsets: Optional character offsets of headers to split at
 
     Returns:
         Dictionary containing chunks and metadata about the chunking process
@@ -45,9 +54,18 @@ async def chunk_document(
         return {"chunks": [], "error": "No text provided"}
 
     try:
-        chunks = await create_chunks(text, chunk_size, chunk_overlap)
-        total_tokens = await count_tokens(text)
-        chunk_tokens = [await count_tokens(c) for c in chunks]
+        if len(text) > OFFLOAD_THRESHOLD_CHARS:
+            chunks, chunk_tokens, total_tokens = await asyncio.to_thread(
+                create_chunks_with_stats,
+                text,
+                chunk_size,
+                chunk_overlap,
+                header_offsets,
+            )
+        else:
+            chunks, chunk_tokens, total_tokens = create_chunks_with_stats(
+                text, chunk_size, chunk_overlap, header_offsets
+            )
 
         return {
             "chunks": chunks,
@@ -4,16 +4,46 @@ This module implements the main FastAPI application, handling middleware setup,
 exception handling, and static file serving.
 """
 
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 
+from src.backend.config import settings
 from src.backend.exceptions import AppError
-from src.backend.routes import router
+from src.backend.routes import create_langgraph_client, router
+from src.backend.utils.document_ingestion import shutdown_ingestion
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Create the shared LangGraph client on startup.
+
+    On shutdown, finish queued vector store writes, stop the PDF extraction
+    workers and close the client.
+    """
+    client = create_langgraph_client()
+    app.state.langgraph_client = client
+
+    # Open a connection before the first request; the API may not be up yet,
+    # so don't let the transport's timeouts and retries hold up startup
+    try:
+        async with asyncio.timeout(settings.langgraph_warmup_timeout_s):
+            await client.threads.search(limit=1)
+    except Exception as e:
+        logging.warning(f"LangGraph client warmup failed: {e}")
+
+    try:
+        yield
+    finally:
+        await shutdown_ingestion()
+        await client.http.client.aclose()
 
 
 # Initialize FastAPI app
@@ -21,27 +51,16 @@ app = FastAPI(
     title="LangGraph Chat API",
     description="REST API for LangGraph chat interface",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:*",
-        "http://127.0.0.1:*",
-        "http://0.0.0.0:*",
-        "http://localhost:5500",
-        "http://127.0.0.1:5500",
-        "http://localhost:8000",
-        "http://127.0.0.1:8000",
-        "http://localhost:63342",
-        "http://127.0.0.1:63342",
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-        "http://localhost:2024",
-        "http://127.0.0.1:2024",
-        "https://smith.langchain.com",
-    ],
+    allow_origins=["https://smith.langchain.com"],
+    # Any port on the local hosts; Starlette does not glob "*" in allow_origins
+    allow_origin_regex=r"^https?://(localhost|127\.0\.0\.1|0\.0\.0\.0)(:\d+)?$",
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -51,7 +70,7 @@ app.add_middleware(
 
 # Exception handlers
 @app.exception_handler(AppError)
-async def app_error_handler(_: Any, exc: AppError) -> JSONResponse:
+async def app_error_handler(_: Any, exc: AppError) -> ORJSONResponse:
     """Handle application-specific errors.
 
     Args:
@@ -59,9 +78,9 @@ async def app_error_handler(_: Any, exc: AppError) -> JSONResponse:
         exc: The exception that was raised
 
     Returns:
-        JSONResponse: A formatted error response
+        ORJSONResponse: A formatted error response
     """
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error": {
@@ -77,6 +96,9 @@ async def app_error_handler(_: Any, exc: AppError) -> JSONResponse:
 static_files_path = Path(__file__).parent.parent / "static"
 app.mount("/static", StaticFiles(directory=str(static_files_path)), name="static")
 
+# The landing page is small and static, so read it once at startup
+_INDEX_BYTES = (static_files_path / "index.html").read_bytes()
+
 # Include API routes
 app.include_router(router, prefix="/api")
 
@@ -84,4 +106,4 @@ app.include_router(router, prefix="/api")
 # Serve index.html for the root path
 @app.get("/")
 async def serve_index():
-    return FileResponse(str(static_files_path / "index.html"))
+    return Response(content=_INDEX_BYTES, media_type="text/html")
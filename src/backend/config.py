@@ -1,23 +1,66 @@
 """Shared configuration settings for the multi-agent system."""
 
+import asyncio
+import functools
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Tuple
 
+import httpx
 from pydantic import Field
 from pydantic_settings import BaseSettings
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+
 # Define project root
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 
 
+@functools.cache
+def _get_http_async_client() -> httpx.AsyncClient:
+    """Get the pooled HTTP client shared by all chat models."""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def _build_model(
+    api_key: str,
+    model_name: str,
+    temperature: float,
+    streaming: bool,
+    kwargs: Tuple[Tuple[str, Any], ...],
+) -> ChatOpenAI:
+    """Build a ChatOpenAI instance, cached per distinct configuration."""
+    return ChatOpenAI(
+        api_key=api_key,
+        model=model_name,
+        temperature=temperature,
+        streaming=streaming,
+        http_async_client=_get_http_async_client(),
+        **dict(kwargs),
+    )
+
+
 class Settings(BaseSettings):
     """Environment configuration with validation."""
 
     # OpenAI
     openai_api_key: str = Field(default="", description="OpenAI API key")
+    embedding_max_concurrency: int = Field(
+        default=8, description="Maximum number of concurrent embedding requests"
+    )
 
     # Tavily
     tavily_api_key: str = Field(default="", description="Tavily API key")
+    tavily_max_concurrency: int = Field(
+        default=8, description="Maximum number of concurrent Tavily requests"
+    )
+    tavily_timeout_s: float = Field(
+        default=8.0, description="Timeout in seconds for a Tavily search"
+    )
 
     # LangChain
     langchain_api_key: str = Field(default="", description="LangChain API key")
@@ -31,6 +74,61 @@ class Settings(BaseSettings):
         default="multi_agent_system", description="LangChain project name"
     )
 
+    # LangGraph API
+    langgraph_api_url: str = Field(
+        default="",
+        description="LangGraph API URL for the routes client; empty uses the in-process API",
+    )
+    langgraph_warmup_timeout_s: float = Field(
+        default=2.0,
+        description="Seconds app startup waits for the LangGraph client warmup request",
+    )
+
+    # Knowledge agent relevance grading. Thresholds use the normalize_score scale
+    # (1 + cosine) / 2, on which unrelated text typically scores around 0.5-0.6.
+    relevance_high_threshold: float = Field(
+        default=0.85,
+        description="Top similarity score above which internal docs are relevant without LLM grading",
+    )
+    relevance_low_threshold: float = Field(
+        default=0.58,
+        description="Top similarity score below which internal docs are irrelevant without LLM grading",
+    )
+
+    # Summarizer agent
+    summarizer_max_concurrency: int = Field(
+        default=16,
+        description="Maximum number of concurrent chunk summary requests across all documents",
+    )
+    summarizer_llm_chunking: bool = Field(
+        default=False,
+        description="Ask the LLM for chunk settings instead of using the size heuristic",
+    )
+
+    # Semantic cache
+    semantic_cache_size: int = Field(
+        default=1024, description="Maximum entries per semantic cache"
+    )
+    semantic_cache_threshold: float = Field(
+        default=0.95, description="Minimum cosine similarity for a semantic cache hit"
+    )
+    retrieval_cache_ttl: float = Field(
+        default=300.0,
+        description="Seconds a cached retrieval is served, bounding staleness after writes from other processes",
+    )
+
+    # Runtime
+    use_uvloop: bool = Field(
+        default=True, description="Use uvloop as the asyncio event loop when available"
+    )
+
+    # Chroma
+    chroma_host: str = Field(
+        default="",
+        description="Chroma server host; empty uses the embedded store under data_dir",
+    )
+    chroma_port: int = Field(default=8000, description="Chroma server port")
+
     # Storage Paths
     data_dir: Path = Field(
         default_factory=lambda: PROJECT_ROOT / "data",
@@ -48,15 +146,35 @@ class Settings(BaseSettings):
         """Full path for Chroma DB storage"""
         return self.data_dir / "chroma_db"
 
+    @property
+    def embedding_cache_path(self) -> Path:
+        """Full path for cached document embeddings"""
+        return self.data_dir / "embedding_cache"
+
     def ensure_dirs(self) -> None:
         """Ensure all required directories exist."""
         dirs = [
             self.data_dir,
             self.chroma_path,
+            self.embedding_cache_path,
         ]
         for dir_path in dirs:
             dir_path.mkdir(parents=True, exist_ok=True)
 
+    def configure_event_loop(self) -> None:
+        """Install uvloop as the asyncio event loop policy if enabled and installed.
+
+        Only needed for entrypoints that call asyncio.run themselves; uvicorn
+        already picks uvloop up with its default loop setting.
+        """
+        if not self.use_uvloop:
+            return
+        try:
+            import uvloop
+        except ImportError:
+            return
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
     @classmethod
     def load_env(cls) -> "Settings":
         """Load configuration from environment variables."""
@@ -81,16 +199,24 @@ class Settings(BaseSettings):
             **kwargs: Additional model configuration options
 
         Returns:
-            Configured ChatOpenAI instance
+            Configured ChatOpenAI instance, shared between calls with the same settings
         """
-        return ChatOpenAI(
-            api_key=self.openai_api_key,
-            model=model_name,
-            temperature=temperature,
-            streaming=streaming,
-            **kwargs,
+        return _build_model(
+            self.openai_api_key,
+            model_name,
+            temperature,
+            streaming,
+            tuple(sorted(kwargs.items())),
         )
 
+    def get_router_model(self) -> ChatOpenAI:
+        """Get the small, deterministic model used for routing decisions.
+
+        Returns:
+            Configured gpt-4o-mini instance with temperature 0 and no streaming
+        """
+        return self.get_model(model_name="gpt-4o-mini", temperature=0, streaming=False)
+
     def get_embeddings(
         self, model_name: str = "text-embedding-3-small", **kwargs
     ) -> OpenAIEmbeddings:
@@ -105,6 +231,31 @@ class Settings(BaseSettings):
         """
         return OpenAIEmbeddings(api_key=self.openai_api_key, model=model_name, **kwargs)
 
+    def get_vectorstore(self, **kwargs) -> "Chroma":
+        """Get a handle on the shared document collection.
+
+        With chroma_host set, connect to a Chroma server so several processes
+        can write concurrently; otherwise open the embedded store in chroma_path.
+
+        Args:
+            **kwargs: Additional Chroma options, such as the embedding function
+
+        Returns:
+            Configured Chroma instance for the rag_documents collection
+        """
+        # Imported here so importing config doesn't load the Chroma stack
+        from langchain_chroma import Chroma
+
+        if self.chroma_host:
+            import chromadb
+
+            kwargs["client"] = chromadb.HttpClient(
+                host=self.chroma_host, port=self.chroma_port
+            )
+        else:
+            kwargs["persist_directory"] = str(self.chroma_path)
+        return Chroma(collection_name="rag_documents", **kwargs)
+
 
 # Load environment configuration
 settings = Settings.load_env()
@@ -5,21 +5,42 @@ and message processing using LangGraph.
 """
 
 import asyncio
-import json
+import heapq
 import logging
 import os
+import re
 import shutil
 import tempfile
 import uuid
 from datetime import datetime
-from typing import Any, AsyncGenerator, Dict
-
-from fastapi import APIRouter, File, UploadFile
+from typing import Any, AsyncGenerator, Dict, Optional, Tuple, Union
+
+import aiofiles
+import httpx
+import orjson
+from cachetools import LRUCache, TTLCache
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
 from fastapi.responses import StreamingResponse
 from langgraph_sdk import get_client
-
-from src.backend.exceptions import ConflictError, InternalServerError, NotFoundError
-from src.backend.utils.document_ingestion import ingest_file
+from langgraph_sdk.client import LangGraphClient
+
+from src.backend.config import settings
+from src.backend.exceptions import (
+    ConflictError,
+    InternalServerError,
+    NotFoundError,
+    ValidationError,
+)
+from src.backend.utils.document_ingestion import SUPPORTED_EXTENSIONS, ingest_file
 from src.backend.schemas import (
     APIResponse,
     ConversationListResponse,
@@ -29,13 +50,57 @@ from src.backend.schemas import (
     MessageRequest,
     NewThreadResponse,
     RunIdResponse,
+    UploadQueuedResponse,
 )
 
 # Initialize the router
 router = APIRouter()
 
-# Initialize the LangGraph client
-langgraph_client = get_client()
+
+def create_langgraph_client() -> LangGraphClient:
+    """Create the LangGraph SDK client used by the routes.
+
+    With no URL configured, keep the SDK default, which uses the in-process
+    transport when running inside the LangGraph server. For a remote API, use a
+    keep-alive connection pool sized for concurrent streams.
+    """
+    if not settings.langgraph_api_url:
+        return get_client()
+
+    http_client = httpx.AsyncClient(
+        base_url=settings.langgraph_api_url,
+        transport=httpx.AsyncHTTPTransport(
+            retries=5,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+        ),
+        timeout=httpx.Timeout(connect=5, read=300, write=300, pool=5),
+    )
+    return LangGraphClient(http_client)
+
+
+def get_langgraph_client(request: Request) -> LangGraphClient:
+    """Get the LangGraph client created by the app lifespan."""
+    return request.app.state.langgraph_client
+
+
+# Read size when copying an upload to disk
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Maximum number of concurrent thread deletions in delete_all_threads
+BULK_DELETE_CONCURRENCY = 32
+
+# Short-lived cache for the conversations list keyed by limit, cleared on thread changes
+CONVERSATIONS_CACHE_TTL = 5.0
+conversations_cache: TTLCache = TTLCache(maxsize=16, ttl=CONVERSATIONS_CACHE_TTL)
+
+# Parsed conversations keyed by (thread_id, checkpoint id)
+conversation_cache: LRUCache = LRUCache(maxsize=256)
+
+
+def invalidate_conversation(thread_id: str) -> None:
+    """Drop the cached parses of a thread."""
+    for key in [key for key in conversation_cache if key[0] == thread_id]:
+        del conversation_cache[key]
 
 
 @router.get("/", response_model=APIResponse)
@@ -54,71 +119,50 @@ async def root() -> APIResponse:
     return APIResponse(status="success", message="LangGraph Chat API is running")
 
 
-@router.post("/upload-document/", response_model=Dict[str, Any])
-async def upload_document_route(file: UploadFile = File(...)):
+@router.post(
+    "/upload-document/",
+    response_model=UploadQueuedResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def upload_document_route(
+    background_tasks: BackgroundTasks, file: UploadFile = File(...)
+) -> UploadQueuedResponse:
     """
-    Upload a document for ingestion into the vector store.
-    Supports .txt, .md, .pdf (PDF requires additional parsing logic not yet implemented).
+    Upload a document and queue it for ingestion into the vector store.
+    Supports .txt, .md and .pdf. The response is returned as soon as the file is
+    stored; parsing, chunking and embedding run in a background task.
     """
+    # Multipart parts may omit the filename, which leaves it None
+    if not file.filename or not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise ValidationError(
+            detail=f"Unsupported file type: {file.filename}. Please upload .txt, .md, or .pdf files.",
+            code="UNSUPPORTED_FILE_TYPE",
+        )
+
     temp_dir = None
     try:
         # Create a temporary directory to store the uploaded file asynchronously
         temp_dir = await asyncio.to_thread(tempfile.mkdtemp)
-        temp_file_path = os.path.join(temp_dir, file.filename)
-
-        # Save the uploaded file to the temporary path asynchronously
-        with open(
-            temp_file_path, "wb"
-        ) as buffer:  # open() is sync, but usually acceptable for temp files
-            await asyncio.to_thread(shutil.copyfileobj, file.file, buffer)
-
-        # Ingest the file
-        # Note: ingest_file expects .txt or .md. PDF/DOCX would need text extraction first.
-        # For now, we assume the file content is directly readable as text.
-        # If file.content_type is 'application/pdf', we'd need PyPDF2 or similar.
-        # If 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', python-docx.
-
-        # For simplicity, this example directly calls ingest_file.
-        # Production systems should handle different file types and extract text accordingly.
-        if not file.filename.endswith((".txt", ".md")):
-            # Basic check, can be expanded
-            # For PDF/DOCX, you would extract text here before passing to ingest_document
-            # For now, we'll raise an error for unsupported types if not txt/md
-            # but ingest_file itself might handle it or error out.
-            # Let's assume ingest_file can handle the path for now.
-            pass
-
-        result = await ingest_file(temp_file_path)
-
-        if result.get("status") == "error":
-            # Propagate error more clearly if needed
-            if "File not found" in result.get("error", ""):
-                raise NotFoundError(
-                    detail=result["error"], code="FILE_NOT_FOUND_INGESTION"
-                )
-            raise InternalServerError(
-                detail=result.get("error", "Failed to ingest document"),
-                code="INGESTION_ERROR",
-            )
-
-        return result
+        temp_file_path = os.path.join(temp_dir, os.path.basename(file.filename))
 
+        # Stream the uploaded file to the temporary path without holding a thread
+        async with aiofiles.open(temp_file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await buffer.write(chunk)
     except Exception as e:
         # Log the exception for debugging
-        logging.error(f"Error during file upload and ingestion: {e}", exc_info=True)
+        logging.error(f"Error saving uploaded file: {e}", exc_info=True)
+        if temp_dir:
+            await asyncio.to_thread(shutil.rmtree, temp_dir, ignore_errors=True)
         raise InternalServerError(
             detail=f"An unexpected error occurred during file upload: {str(e)}",
             code="UPLOAD_PROCESSING_ERROR",
         )
-    finally:
-        # Clean up the temporary directory asynchronously
-        if temp_dir and os.path.exists(temp_dir):
-            await asyncio.to_thread(shutil.rmtree, temp_dir)
-        if hasattr(file, "file") and hasattr(file.file, "close"):
-            # file.file.close() can also be blocking, though often quick.
-            # For strict non-blocking, it could also be wrapped if it becomes an issue.
-            # However, FastAPI typically handles closing the UploadFile stream.
-            pass  # FastAPI handles closing file.file
+
+    # The background task owns the temporary directory from here on
+    job_id = uuid.uuid4().hex
+    background_tasks.add_task(ingest_uploaded_file, temp_dir, temp_file_path, job_id)
+    return UploadQueuedResponse(job_id=job_id, filename=file.filename)
 
 
 @router.get("/new-thread", response_model=NewThreadResponse)
@@ -139,15 +183,21 @@ async def new_thread() -> NewThreadResponse:
 
 
 @router.get("/conversations-list", response_model=ConversationListResponse)
-async def get_conversations() -> ConversationListResponse:
-    """Get all available conversations.
+async def get_conversations(
+    limit: int = Query(default=50, ge=1, le=1000),
+    langgraph_client: LangGraphClient = Depends(get_langgraph_client),
+) -> ConversationListResponse:
+    """Get the most recent conversations.
+
+    Args:
+        limit: Maximum number of conversations to return
 
     Returns:
-        List of conversations with their creation timestamps and thread IDs
+        Newest conversations first, with their creation timestamps and thread IDs
 
     Example:
         ```
-        GET /conversations-list
+        GET /conversations-list?limit=50
         Response: [
             {
                 "thread_id": "123e4567-e89b-12d3-a456-426614174000",
@@ -156,23 +206,42 @@ async def get_conversations() -> ConversationListResponse:
         ]
         ```
     """
-    try:
-        # Search for all threads (with a high limit to get all)
-        threads = await langgraph_client.threads.search(limit=1000)
-
-        # Extract thread info and sort by creation time
-        conversations = []
-        for thread in threads:
-            thread_id = thread["thread_id"]
-            metadata = thread.get("metadata", {})
-            created_at = metadata.get("created_at")
+    cached = conversations_cache.get(limit)
+    if cached is not None:
+        return cached
 
-            if created_at:
-                conversations.append({"thread_id": thread_id, "created_at": created_at})
+    try:
+        # Page through threads newest first until enough have a creation time
+        entries = []
+        offset = 0
+        while len(entries) < limit:
+            threads = await langgraph_client.threads.search(
+                limit=limit, offset=offset, sort_by="created_at", sort_order="desc"
+            )
 
-        # Sort conversations by creation time, newest first
-        conversations.sort(key=lambda x: x["created_at"], reverse=True)
-        return ConversationListResponse(conversations=conversations)
+            # Parse each creation time once into a sortable timestamp
+            for thread in threads:
+                created_at = thread.get("metadata", {}).get("created_at")
+                if not created_at:
+                    continue
+                try:
+                    created = datetime.fromisoformat(created_at)
+                except ValueError:
+                    continue
+                entries.append((-created.timestamp(), thread["thread_id"], created))
+
+            if len(threads) < limit:
+                break
+            offset += limit
+
+        # Keep only the newest conversations
+        conversations = [
+            {"thread_id": thread_id, "created_at": created}
+            for _, thread_id, created in heapq.nsmallest(limit, entries)
+        ]
+        response = ConversationListResponse(conversations=conversations)
+        conversations_cache[limit] = response
+        return response
 
     except Exception as e:
         raise ConflictError(
@@ -182,7 +251,10 @@ async def get_conversations() -> ConversationListResponse:
 
 
 @router.get("/conversations/{thread_id}", response_model=ConversationResponse)
-async def conversation(thread_id: str) -> ConversationResponse:
+async def conversation(
+    thread_id: str,
+    langgraph_client: LangGraphClient = Depends(get_langgraph_client),
+) -> ConversationResponse:
     """Get a specific conversation and its messages.
 
     Args:
@@ -195,15 +267,19 @@ async def conversation(thread_id: str) -> ConversationResponse:
         NotFoundError: If the thread doesn't exist
     """
     try:
-        # Create thread if it doesn't exist
-        await langgraph_client.threads.create(
-            thread_id=thread_id,
-            if_exists="do_nothing",
-            metadata={"created_at": str(datetime.now())},
-        )
-
-        # Get thread state
-        state = await langgraph_client.threads.get_state(thread_id)
+        # Get thread state, creating the thread if it doesn't exist
+        try:
+            state = await langgraph_client.threads.get_state(thread_id)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != status.HTTP_404_NOT_FOUND:
+                raise
+            await langgraph_client.threads.create(
+                thread_id=thread_id,
+                if_exists="do_nothing",
+                metadata={"created_at": datetime.now().isoformat()},
+            )
+            conversations_cache.clear()
+            state = await langgraph_client.threads.get_state(thread_id)
         values = state["values"]
 
         # Extract messages
@@ -212,9 +288,18 @@ async def conversation(thread_id: str) -> ConversationResponse:
         else:
             raw_messages = values.get("messages", [])
 
+        # Reuse the parsed conversation while the thread state is unchanged
+        checkpoint_id = (state.get("checkpoint") or {}).get("checkpoint_id")
+        cache_key = (thread_id, checkpoint_id or len(raw_messages))
+        cached = conversation_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         # Convert messages
         messages: list[Message] = []
-        tool_call_buffer = {}  # Buffer to store tool calls until we find their results
+        append_message = messages.append
+        # Tool calls waiting for their results, keyed by tool call id
+        tool_call_buffer: Dict[str, Dict[str, Any]] = {}
 
         for msg in raw_messages:
             msg_type = msg.get("type", "")
@@ -223,81 +308,100 @@ async def conversation(thread_id: str) -> ConversationResponse:
             # Handle content lists
             if isinstance(content, list):
                 content = "".join(
-                    c["text"] for c in content if isinstance(c, dict) and c.get("text")
+                    [
+                        text
+                        for c in content
+                        if type(c) is dict and (text := c.get("text"))
+                    ]
                 )
 
             # Map message types
             if msg_type == "human":
-                messages.append(Message(role="user", content=content))
+                append_message(
+                    Message.model_construct(role="user", content=content)
+                )
             elif msg_type in ["ai", "assistant"] and content:
-                messages.append(Message(role="assistant", content=content))
+                append_message(
+                    Message.model_construct(role="assistant", content=content)
+                )
             # Handle tool calls
             elif msg_type == "ai" and msg.get("tool_calls"):
                 for tool_call in msg.get("tool_calls", []):
                     tool_name = tool_call.get("name", "unknown_tool")
                     tool_args = tool_call.get("args", {})
                     # Store in buffer for later combination with result
-                    tool_call_buffer[tool_name] = {
+                    tool_call_buffer[tool_call.get("id") or tool_name] = {
                         "name": tool_name,
                         "arguments": tool_args,
                     }
             # Handle tool results
             elif msg_type in ["tool", "function"]:
                 tool_name = msg.get("name", "unknown_tool")
-                # Check if we have a matching call in the buffer
-                if tool_name in tool_call_buffer:
+                # Find the matching call by id, falling back to the first call by name
+                call_data = tool_call_buffer.pop(msg.get("tool_call_id"), None)
+                if call_data is None:
+                    call_id = next(
+                        (
+                            key
+                            for key, data in tool_call_buffer.items()
+                            if data["name"] == tool_name
+                        ),
+                        None,
+                    )
+                    if call_id is not None:
+                        call_data = tool_call_buffer.pop(call_id)
+
+                if call_data is not None:
                     # Combine tool call and result
-                    messages.append(
-                        Message(
+                    append_message(
+                        Message.model_construct(
                             role="tool_message",
-                            content=json.dumps(
+                            content=orjson.dumps(
                                 {
                                     "type": "tool_combined",
                                     "name": tool_name,
                                     "call": {
-                                        "name": tool_call_buffer[tool_name]["name"],
-                                        "arguments": tool_call_buffer[tool_name][
-                                            "arguments"
-                                        ],
+                                        "name": call_data["name"],
+                                        "arguments": call_data["arguments"],
                                     },
                                     "result": content,
                                 }
-                            ),
+                            ).decode(),
                         )
                     )
-                    # Remove from buffer
-                    del tool_call_buffer[tool_name]
                 else:
                     # If no matching call, create standalone result
-                    messages.append(
-                        Message(
+                    append_message(
+                        Message.model_construct(
                             role="tool_message",
-                            content=json.dumps(
+                            content=orjson.dumps(
                                 {
                                     "type": "tool_result",
                                     "name": tool_name,
                                     "result": content,
                                 }
-                            ),
+                            ).decode(),
                         )
                     )
 
         # Add any remaining tool calls that didn't get results
-        for tool_name, call_data in tool_call_buffer.items():
-            messages.append(
-                Message(
+        for call_data in tool_call_buffer.values():
+            append_message(
+                Message.model_construct(
                     role="tool_message",
-                    content=json.dumps(
+                    content=orjson.dumps(
                         {
                             "type": "tool_call",
-                            "name": tool_name,
+                            "name": call_data["name"],
                             "arguments": call_data["arguments"],
                         }
-                    ),
+                    ).decode(),
                 )
             )
 
-        return ConversationResponse(messages=messages)
+        response = ConversationResponse.model_construct(messages=messages)
+        conversation_cache[cache_key] = response
+        return response
 
     except Exception as e:
         raise NotFoundError(
@@ -306,7 +410,11 @@ async def conversation(thread_id: str) -> ConversationResponse:
 
 
 @router.post("/conversations/{thread_id}/send-message", response_model=RunIdResponse)
-async def send_message(thread_id: str, request: MessageRequest) -> dict[str, Any]:
+async def send_message(
+    thread_id: str,
+    request: MessageRequest,
+    langgraph_client: LangGraphClient = Depends(get_langgraph_client),
+) -> dict[str, Any]:
     """Send a message in a conversation.
 
     Args:
@@ -324,6 +432,8 @@ async def send_message(thread_id: str, request: MessageRequest) -> dict[str, Any
             input={"messages": [{"type": "human", "content": request.message}]},
             stream_mode="messages-tuple",
         )
+        conversations_cache.clear()
+        invalidate_conversation(thread_id)
         return {"run_id": run["run_id"]}
     except Exception as e:
         raise NotFoundError(
@@ -333,7 +443,11 @@ async def send_message(thread_id: str, request: MessageRequest) -> dict[str, Any
 
 
 @router.get("/conversations/{thread_id}/stream-message")
-async def stream_message(thread_id: str, run_id: str) -> StreamingResponse:
+async def stream_message(
+    thread_id: str,
+    run_id: str,
+    langgraph_client: LangGraphClient = Depends(get_langgraph_client),
+) -> StreamingResponse:
     """Stream assistant responses via SSE.
 
     Args:
@@ -344,7 +458,7 @@ async def stream_message(thread_id: str, run_id: str) -> StreamingResponse:
         StreamingResponse: Server-sent events stream of assistant responses
     """
     return StreamingResponse(
-        message_generator(thread_id, run_id),
+        message_generator(langgraph_client, thread_id, run_id),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache, no-transform",
@@ -357,7 +471,10 @@ async def stream_message(thread_id: str, run_id: str) -> StreamingResponse:
 
 
 @router.delete("/conversations/{thread_id}", response_model=DeleteResponse)
-async def delete_thread(thread_id: str) -> DeleteResponse:
+async def delete_thread(
+    thread_id: str,
+    langgraph_client: LangGraphClient = Depends(get_langgraph_client),
+) -> DeleteResponse:
     """Delete a specific conversation thread.
 
     Args:
@@ -381,6 +498,8 @@ async def delete_thread(thread_id: str) -> DeleteResponse:
 
         # Delete the thread
         await langgraph_client.threads.delete(thread_id)
+        conversations_cache.clear()
+        invalidate_conversation(thread_id)
 
         return DeleteResponse(
             success=True, message=f"Thread {thread_id} deleted successfully"
@@ -392,7 +511,9 @@ async def delete_thread(thread_id: str) -> DeleteResponse:
 
 
 @router.delete("/conversations", response_model=DeleteResponse)
-async def delete_all_threads() -> DeleteResponse:
+async def delete_all_threads(
+    langgraph_client: LangGraphClient = Depends(get_langgraph_client),
+) -> DeleteResponse:
     """Delete all conversation threads.
 
     Returns:
@@ -408,14 +529,23 @@ async def delete_all_threads() -> DeleteResponse:
         # Search for all threads (with a high limit to get all)
         threads = await langgraph_client.threads.search(limit=1000)
 
-        # Delete each thread
-        deleted_count = 0
-        for thread in threads:
-            try:
-                await langgraph_client.threads.delete(thread["thread_id"])
-                deleted_count += 1
-            except Exception:
-                continue
+        # Delete the threads concurrently, a bounded number at a time
+        semaphore = asyncio.Semaphore(BULK_DELETE_CONCURRENCY)
+
+        async def delete_one(thread_id: str) -> bool:
+            async with semaphore:
+                try:
+                    await langgraph_client.threads.delete(thread_id)
+                    return True
+                except Exception:
+                    return False
+
+        results = await asyncio.gather(
+            *(delete_one(thread["thread_id"]) for thread in threads)
+        )
+        deleted_count = sum(results)
+        conversations_cache.clear()
+        conversation_cache.clear()
 
         return DeleteResponse(
             success=True, message=f"Successfully deleted {deleted_count} threads"
@@ -426,12 +556,152 @@ async def delete_all_threads() -> DeleteResponse:
         )
 
 
+# Labels of reasoning marker blocks that should not reach the client
+MARKER_PATTERN = re.compile(r"Confidence|Score|Reasoning|Analysis|Process|Selected")
+
+# Pre-encoded SSE framing
+SSE_MESSAGE_PREFIX = b"event: message\ndata: "
+SSE_EVENT_END = b"\n\n"
+SSE_CLOSE_EVENT = b"event: close\ndata:\n\n"
+
+# Upstream events buffered ahead of the client
+SSE_QUEUE_SIZE = 32
+# Consecutive assistant deltas are sent together up to this size or delay
+SSE_COALESCE_MAX_BYTES = 16 * 1024
+SSE_COALESCE_MAX_DELAY = 0.02  # seconds
+# Comment sent on idle streams so proxies don't close the connection
+SSE_KEEPALIVE_EVENT = b": keepalive\n\n"
+SSE_KEEPALIVE_INTERVAL = 15.0  # seconds
+
+
+def sse_message(data: Dict[str, Any]) -> bytes:
+    """Encode a payload as an SSE message event."""
+    return SSE_MESSAGE_PREFIX + orjson.dumps(data) + SSE_EVENT_END
+
+
+def new_json_scan() -> Dict[str, Any]:
+    """Create the state for advance_json_scan."""
+    return {"depth": 0, "in_str": False, "esc": False}
+
+
+def advance_json_scan(scan: Dict[str, Any], fragment: str) -> bool:
+    """Track brace depth across streamed JSON fragments.
+
+    Args:
+        scan: State from new_json_scan, updated in place
+        fragment: Next piece of the JSON text
+
+    Returns:
+        True if the top-level value closed within this fragment
+    """
+    depth, in_str, esc = scan["depth"], scan["in_str"], scan["esc"]
+    closed = False
+    for char in fragment:
+        if esc:
+            esc = False
+        elif in_str:
+            if char == "\\":
+                esc = True
+            elif char == '"':
+                in_str = False
+        elif char == '"':
+            in_str = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            closed = closed or depth == 0
+    scan["depth"], scan["in_str"], scan["esc"] = depth, in_str, esc
+    return closed
+
+
 # Helper function to stream assistant responses via SSE
-async def message_generator(thread_id: str, run_id: str) -> AsyncGenerator[str, None]:
-    """Stream assistant responses via SSE."""
+async def message_generator(
+    langgraph_client: LangGraphClient, thread_id: str, run_id: str
+) -> AsyncGenerator[bytes, None]:
+    """Stream assistant responses via SSE.
+
+    A separate task reads the run into a bounded queue, so the upstream stream
+    keeps flowing while the client write is pending. Consecutive assistant
+    deltas are written together; tool events are flushed immediately. A
+    keep-alive comment is queued periodically while the run is in progress.
+    """
+    queue: asyncio.Queue[Union[Tuple[bool, bytes], Exception, None]] = (
+        asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+    )
+
+    async def produce() -> None:
+        try:
+            async for event in stream_run_events(langgraph_client, thread_id, run_id):
+                await queue.put(event)
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(None)
+
+    async def keepalive() -> None:
+        while True:
+            await asyncio.sleep(SSE_KEEPALIVE_INTERVAL)
+            await queue.put((False, SSE_KEEPALIVE_EVENT))
+
+    loop = asyncio.get_running_loop()
+    producer = asyncio.create_task(produce())
+    pinger = asyncio.create_task(keepalive())
+    pending = bytearray()
+    deadline: Optional[float] = None
+    try:
+        while True:
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except TimeoutError:
+                yield bytes(pending)
+                pending.clear()
+                deadline = None
+                continue
+
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+
+            coalesce, frame = item
+            if coalesce:
+                pending += frame
+                if deadline is None:
+                    deadline = loop.time() + SSE_COALESCE_MAX_DELAY
+                if len(pending) < SSE_COALESCE_MAX_BYTES:
+                    continue
+                frame = b""
+            if pending:
+                yield bytes(pending)
+                pending.clear()
+                deadline = None
+            if frame:
+                yield frame
+
+        if pending:
+            yield bytes(pending)
+        # Send closing event
+        yield SSE_CLOSE_EVENT
+    finally:
+        producer.cancel()
+        pinger.cancel()
+
+
+async def stream_run_events(
+    langgraph_client: LangGraphClient, thread_id: str, run_id: str
+) -> AsyncGenerator[Tuple[bool, bytes], None]:
+    """Read a run's message stream as SSE frames.
+
+    Yields:
+        Pairs of whether the frame is an assistant delta, and the encoded frame
+    """
     # We only care about the answer node (which is now our final node) and tool calls
     current_node = None
     tool_calls_buffer = {}
+    # Most recently buffered tool, for argument deltas that carry no name
+    last_tool = None
 
     logging.info(f"Starting to stream messages for thread {thread_id}, run {run_id}")
 
@@ -469,38 +739,26 @@ async def message_generator(thread_id: str, run_id: str) -> AsyncGenerator[str,
                                         "name": tool_name,
                                         "arguments": "",
                                         "args_complete": False,
+                                        "parts": [],
+                                        "scan": new_json_scan(),
                                     }
+                                    last_tool = tool_name
 
                                 # If we have args but no name, append to the last tool's arguments
-                                if args and tool_calls_buffer:
-                                    target_tool = (
-                                        tool_name
-                                        if tool_name
-                                        else list(tool_calls_buffer.keys())[-1]
-                                    )
-                                    if not tool_calls_buffer[target_tool][
-                                        "args_complete"
-                                    ]:
-                                        tool_calls_buffer[target_tool]["arguments"] += (
-                                            args
-                                        )
-
-                                        # Check if we have complete arguments
-                                        current_args = tool_calls_buffer[target_tool][
-                                            "arguments"
-                                        ]
-                                        if current_args.strip().startswith(
-                                            "{"
-                                        ) and current_args.strip().endswith("}"):
+                                target_tool = tool_name or last_tool
+                                if args and target_tool in tool_calls_buffer:
+                                    call_data = tool_calls_buffer[target_tool]
+                                    if not call_data["args_complete"]:
+                                        call_data["parts"].append(args)
+
+                                        # Parse once the top-level object closes
+                                        if advance_json_scan(call_data["scan"], args):
                                             try:
-                                                parsed_args = json.loads(current_args)
-                                                tool_calls_buffer[target_tool][
-                                                    "arguments"
-                                                ] = parsed_args
-                                                tool_calls_buffer[target_tool][
-                                                    "args_complete"
-                                                ] = True
-                                            except json.JSONDecodeError:
+                                                call_data["arguments"] = orjson.loads(
+                                                    "".join(call_data["parts"])
+                                                )
+                                                call_data["args_complete"] = True
+                                            except orjson.JSONDecodeError:
                                                 pass
 
                     # Handle tool results
@@ -516,33 +774,25 @@ async def message_generator(thread_id: str, run_id: str) -> AsyncGenerator[str,
                             call_data = tool_calls_buffer[tool_name]
                             data = {
                                 "role": "tool_message",
-                                "content": json.dumps(
-                                    {
-                                        "type": "tool_combined",
-                                        "name": tool_name,
-                                        "call": {
-                                            "name": tool_name,
-                                            "arguments": call_data["arguments"],
-                                        },
-                                        "result": result,
-                                    }
-                                ),
+                                "type": "tool_combined",
+                                "name": tool_name,
+                                "call": {
+                                    "name": tool_name,
+                                    "arguments": call_data["arguments"],
+                                },
+                                "result": result,
                             }
-                            yield f"event: message\ndata: {json.dumps(data)}\n\n"
+                            yield False, sse_message(data)
                             del tool_calls_buffer[tool_name]
                         else:
                             # If no matching call or incomplete args, send just the result
                             data = {
                                 "role": "tool_message",
-                                "content": json.dumps(
-                                    {
-                                        "type": "tool_result",
-                                        "name": tool_name,
-                                        "result": result,
-                                    }
-                                ),
+                                "type": "tool_result",
+                                "name": tool_name,
+                                "result": result,
                             }
-                            yield f"event: message\ndata: {json.dumps(data)}\n\n"
+                            yield False, sse_message(data)
 
                     # Only stream content from the answer node
                     elif (
@@ -552,20 +802,39 @@ async def message_generator(thread_id: str, run_id: str) -> AsyncGenerator[str,
                         and msg_type == "AIMessageChunk"
                     ):
                         # Skip marker blocks
-                        if not content.startswith("[") and not any(
-                            label in content
-                            for label in [
-                                "Confidence",
-                                "Score",
-                                "Reasoning",
-                                "Analysis",
-                                "Process",
-                                "Selected",
-                            ]
+                        if (
+                            not content.startswith("[")
+                            and MARKER_PATTERN.search(content) is None
                         ):
                             # logging.info(f"STREAMING ANSWER: '{content}'")
-                            data = {"role": "assistant", "content": content}
-                            yield f"event: message\ndata: {json.dumps(data)}\n\n"
+                            yield True, sse_message(
+                                {"role": "assistant", "content": content}
+                            )
+
+
+# Helper function to ingest uploads in the background
+async def ingest_uploaded_file(temp_dir: str, file_path: str, job_id: str) -> None:
+    """Ingest an uploaded file in the background, then remove its temporary directory.
 
-    # Send closing event
-    yield "event: close\ndata:\n\n"
+    Args:
+        temp_dir: Temporary directory holding the upload
+        file_path: Path of the uploaded file inside temp_dir
+        job_id: Identifier returned to the client for this upload
+    """
+    try:
+        result = await ingest_file(file_path)
+        if result.get("status") == "error":
+            logging.error(f"Ingestion job {job_id} failed: {result.get('error')}")
+        elif result.get("status") == "partial":
+            logging.warning(
+                f"Ingestion job {job_id} stored {result.get('num_chunks')} chunks "
+                f"before failing: {result.get('error')}"
+            )
+        else:
+            logging.info(
+                f"Ingestion job {job_id} finished with {result.get('num_chunks')} chunks"
+            )
+    except Exception as e:
+        logging.error(f"Ingestion job {job_id} failed: {e}", exc_info=True)
+    finally:
+        await asyncio.to_thread(shutil.rmtree, temp_dir, ignore_errors=True)
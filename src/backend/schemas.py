@@ -3,12 +3,14 @@
 from datetime import datetime
 from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class Message(BaseModel):
     """Model for chat messages."""
 
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     role: Literal["user", "assistant", "tool_message"]
     content: str
 
@@ -66,3 +68,11 @@ class NewThreadResponse(BaseModel):
     """Response model for new thread creation."""
 
     thread_id: str = Field(..., description="The unique identifier of the new thread")
+
+
+class UploadQueuedResponse(BaseModel):
+    """Response model for a document upload queued for ingestion."""
+
+    status: Literal["queued"] = "queued"
+    job_id: str = Field(..., description="Identifier of the background ingestion job")
+    filename: str = Field(..., description="Name of the uploaded file")
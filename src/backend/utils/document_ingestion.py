@@ -1,33 +1,205 @@
 """Utility script for ingesting documents into the RAG vector store."""
 
 import asyncio
-from typing import Dict, Optional
+import functools
+import logging
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Tuple
 
-import aiofiles
 import argparse
 import os
-from langchain_chroma import Chroma
-from langchain_core.documents import Document
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
 from langchain_core.tools import tool
+from langchain_openai import OpenAIEmbeddings
 from pydantic import BaseModel, Field
-from PyPDF2 import PdfReader
 
+from backend.agents.knowledge.cache import retrieval_cache
 from backend.config import settings
-from backend.utils.file_utils import create_chunks
+from backend.utils.file_utils import (
+    OFFLOAD_THRESHOLD_CHARS,
+    create_chunks,
+    iter_pdf_text,
+    shutdown_pdf_process_pool,
+)
 
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+
 load_dotenv()
 
-# Initialize components
-embeddings = settings.get_embeddings()
+# Heavy components are created on first use rather than at import time
+@functools.cache
+def get_embeddings() -> OpenAIEmbeddings:
+    """Get the embeddings model used for ingestion."""
+    return settings.get_embeddings()
 
-# Initialize vector store - Chroma handles database creation and management
-vectorstore = Chroma(
-    collection_name="rag_documents",
-    embedding_function=embeddings,
-    persist_directory=str(settings.chroma_path),  # Ensure path is a string
-)
+
+@functools.cache
+def get_cached_embeddings() -> CacheBackedEmbeddings:
+    """Get the ingestion embeddings, cached on disk.
+
+    Chunks that were ingested before reuse their stored embeddings, keyed by a
+    hash of the chunk text and namespaced by model.
+    """
+    embeddings = get_embeddings()
+    return CacheBackedEmbeddings.from_bytes_store(
+        embeddings,
+        LocalFileStore(str(settings.embedding_cache_path)),
+        namespace=embeddings.model,
+    )
+
+
+@functools.cache
+def get_vectorstore() -> "Chroma":
+    """Get the vector store that ingested documents are written to."""
+    return settings.get_vectorstore(embedding_function=get_cached_embeddings())
+
+
+# Characters dropped from a document's source when building chunk IDs
+_UNSAFE_SOURCE_CHARS_RE = re.compile(r"[^\w. -]")
+
+# Token size and overlap of the chunks stored in the vector store
+INGEST_CHUNK_SIZE = 1000
+INGEST_CHUNK_OVERLAP = 200
+
+# Chunks collected into one vector store write, and how long to wait for more
+INGEST_BATCH_SIZE = 200
+INGEST_BATCH_DELAY = 0.5  # seconds
+
+# Chunk IDs, texts and metadata waiting for the batch writer, with a future to
+# resolve once they are stored
+IngestItem = Tuple[List[str], List[str], Optional[Dict], asyncio.Future]
+_ingest_queue: Optional["asyncio.Queue[Optional[IngestItem]]"] = None
+_ingest_worker: Optional[asyncio.Task] = None
+
+# Bound concurrent embedding requests across sub-batches of one write
+embedding_semaphore = asyncio.Semaphore(settings.embedding_max_concurrency)
+
+
+async def _add_texts(
+    ids: List[str], texts: List[str], metadatas: List[Optional[Dict]]
+) -> None:
+    """Embed texts in concurrent sub-batches and upsert them into the collection.
+
+    The embeddings are passed to Chroma directly, skipping LangChain's
+    per-document add path.
+    """
+    # Opening the store on first use touches disk, so keep it off the event loop
+    vectorstore = await asyncio.to_thread(get_vectorstore)
+    embeddings = get_cached_embeddings()
+    batch_size = get_embeddings().chunk_size
+
+    async def add_sub_batch(start: int) -> None:
+        stop = start + batch_size
+        async with embedding_semaphore:
+            vectors = await embeddings.aembed_documents(texts[start:stop])
+        await asyncio.to_thread(
+            vectorstore._collection.upsert,
+            ids=ids[start:stop],
+            documents=texts[start:stop],
+            embeddings=vectors,
+            metadatas=metadatas[start:stop],
+        )
+
+    await asyncio.gather(
+        *(add_sub_batch(start) for start in range(0, len(texts), batch_size))
+    )
+
+
+async def _write_batches(queue: "asyncio.Queue[Optional[IngestItem]]") -> None:
+    """Write queued documents to the vector store in batches until stopped."""
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        item = await queue.get()
+        if item is None:
+            break
+
+        # Collect more documents until the batch is full or the delay expires
+        batch = [item]
+        size = len(item[0])
+        deadline = loop.time() + INGEST_BATCH_DELAY
+        while size < INGEST_BATCH_SIZE:
+            try:
+                item = await asyncio.wait_for(
+                    queue.get(), max(deadline - loop.time(), 0)
+                )
+            except TimeoutError:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+            size += len(item[0])
+
+        ids: List[str] = []
+        texts: List[str] = []
+        metadatas: List[Optional[Dict]] = []
+        for item_ids, item_texts, metadata, _ in batch:
+            ids += item_ids
+            texts += item_texts
+            # Chroma rejects empty metadata dicts but accepts None
+            metadatas += [metadata or None] * len(item_ids)
+        try:
+            await _add_texts(ids, texts, metadatas)
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+
+        # Cached retrievals may be stale once new documents are indexed
+        retrieval_cache.clear()
+        for *_, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+
+async def add_texts_batched(
+    ids: List[str], texts: List[str], metadata: Optional[Dict] = None
+) -> None:
+    """Add chunks of a document to the vector store through the shared batch writer.
+
+    Chunks from concurrent callers are combined into writes of about
+    INGEST_BATCH_SIZE chunks. Returns once these chunks are stored.
+
+    Args:
+        ids: Vector store IDs of the chunks
+        texts: Chunk texts to add
+        metadata: Metadata stored with every chunk
+    """
+    global _ingest_queue, _ingest_worker
+
+    if not ids:
+        return
+
+    loop = asyncio.get_running_loop()
+    if (
+        _ingest_worker is None
+        or _ingest_worker.done()
+        or _ingest_worker.get_loop() is not loop
+    ):
+        _ingest_queue = asyncio.Queue()
+        _ingest_worker = asyncio.create_task(_write_batches(_ingest_queue))
+
+    future = loop.create_future()
+    _ingest_queue.put_nowait((ids, texts, metadata, future))
+    await future
+
+
+async def shutdown_ingestion() -> None:
+    """Write any queued documents, then stop the batch writer and PDF workers."""
+    global _ingest_worker
+
+    if _ingest_worker is not None and not _ingest_worker.done():
+        _ingest_queue.put_nowait(None)
+        await _ingest_worker
+    _ingest_worker = None
+    shutdown_pdf_process_pool()
 
 
 # Define input schema for the tool
@@ -40,31 +212,152 @@ class DocumentInput(BaseModel):
     )
 
 
+async def _chunk_content(content: str) -> List[str]:
+    """Split content into non-blank ingestion chunks, in a worker thread if large."""
+    if len(content) > OFFLOAD_THRESHOLD_CHARS:
+        chunks = await asyncio.to_thread(
+            create_chunks, content, INGEST_CHUNK_SIZE, INGEST_CHUNK_OVERLAP
+        )
+    else:
+        chunks = create_chunks(content, INGEST_CHUNK_SIZE, INGEST_CHUNK_OVERLAP)
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+async def _add_chunks(
+    chunks: List[str], metadata: Optional[Dict], first_index: int = 0
+) -> None:
+    """Store chunks of a document, numbering their IDs from first_index."""
+    source = metadata.get("source", "unknown") if metadata else "unknown"
+    safe_source = _UNSAFE_SOURCE_CHARS_RE.sub("", source)
+    ids = [
+        f"{safe_source}_chunk_{i}"
+        for i in range(first_index, first_index + len(chunks))
+    ]
+    await add_texts_batched(ids, chunks, metadata)
+
+
 @tool("ingest_document", args_schema=DocumentInput)
 async def ingest_document(content: str, metadata: Optional[Dict] = None) -> Dict:
     """Ingest and index a document into the vector store for later retrieval."""
-    chunk_size = 1000
-    chunk_overlap = 200
-
     try:
-        chunks = await create_chunks(content, chunk_size, chunk_overlap)
+        chunks = await _chunk_content(content)
     except Exception as e:
         return {"status": "error", "error": f"Error chunking document: {str(e)}"}
 
-    documents = [
-        Document(page_content=chunk, metadata=metadata or {}) for chunk in chunks
-    ]
+    # Nothing to store, so don't queue an empty write
+    if not chunks:
+        return {"status": "error", "error": "No chunks produced from document"}
 
     try:
-        source = metadata.get("source", "unknown") if metadata else "unknown"
-        safe_source = "".join(c for c in source if c.isalnum() or c in "._- ")
-        ids = [f"{safe_source}_chunk_{i}" for i in range(len(documents))]
-        await vectorstore.aadd_documents(documents=documents, ids=ids)
+        await _add_chunks(chunks, metadata)
         return {"status": "success", "num_chunks": len(chunks), "metadata": metadata}
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
 
+async def ingest_pdf(file_path: str, metadata: Dict) -> Dict:
+    """Ingest a PDF, storing each page range while later ones are extracted.
+
+    The last chunk of each range is held back and split again together with
+    the next range, so chunks still span range boundaries. If extraction or
+    chunking fails partway, the ranges before it are still stored and the
+    status is "partial".
+
+    Args:
+        file_path: Path to the PDF file
+        metadata: Metadata to store with each chunk
+
+    Returns:
+        Dict containing status and metadata about the ingestion
+    """
+    writes: List[asyncio.Task] = []
+    num_chunks = 0
+    carry = ""
+    error: Optional[str] = None
+
+    def add(chunks: List[str]) -> None:
+        nonlocal num_chunks
+        writes.append(asyncio.create_task(_add_chunks(chunks, metadata, num_chunks)))
+        num_chunks += len(chunks)
+
+    try:
+        async for part in iter_pdf_text(file_path):
+            if not part:
+                continue
+            try:
+                chunks = await _chunk_content(f"{carry}\n{part}" if carry else part)
+            except Exception as e:
+                # Earlier ranges are already being written, so finish those
+                error = f"Error chunking document: {str(e)}"
+                break
+            carry = chunks.pop() if chunks else ""
+            if chunks:
+                add(chunks)
+    except Exception as e_pdf:  # pylint: disable=broad-except
+        # Index whatever was extracted before the error
+        logging.error(f"Error reading PDF {file_path}: {e_pdf}")
+        error = f"Error reading PDF: {str(e_pdf)}"
+    if carry:
+        add([carry])
+
+    if not num_chunks:
+        if error:
+            return {"status": "error", "error": error}
+        return {
+            "status": "error",
+            "error": f"No text content extracted from PDF: {metadata['source']}. The PDF might be image-based, encrypted, or corrupted.",
+        }
+
+    # Wait for every write, so none is left running if one fails
+    results = await asyncio.gather(*writes, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            return {"status": "error", "error": str(result)}
+    if error:
+        return {
+            "status": "partial",
+            "error": error,
+            "num_chunks": num_chunks,
+            "metadata": metadata,
+        }
+    return {"status": "success", "num_chunks": num_chunks, "metadata": metadata}
+
+
+async def ingest_text_file(file_path: str, metadata: Dict) -> Dict:
+    """Ingest a plain text or markdown file.
+
+    Args:
+        file_path: Path to the file
+        metadata: Metadata to store with each chunk
+
+    Returns:
+        Dict containing status and metadata about the ingestion
+    """
+    # One read in a worker thread instead of aiofiles' per-chunk hops
+    content = await asyncio.to_thread(
+        Path(file_path).read_text, encoding="utf-8", errors="ignore"
+    )
+
+    if not content.strip():  # General check for empty content after reading
+        return {
+            "status": "error",
+            "error": f"No text content extracted from file: {metadata['source']}",
+        }
+
+    return await ingest_document.ainvoke({"content": content, "metadata": metadata})
+
+
+# Ingestion functions for ingest_file, by lowercase file extension
+_INGEST_HANDLERS: Dict[str, Callable[[str, Dict], Awaitable[Dict]]] = {
+    ".pdf": ingest_pdf,
+    ".txt": ingest_text_file,
+    ".md": ingest_text_file,
+}
+
+# File extensions ingest_file accepts
+SUPPORTED_EXTENSIONS = tuple(_INGEST_HANDLERS)
+
+
 async def ingest_file(file_path: str) -> Dict:
     """Reads a file and ingests its content into the vector store.
 
@@ -74,72 +367,24 @@ async def ingest_file(file_path: str) -> Dict:
     Returns:
         Dict containing status and metadata about the ingestion
     """
-    content = ""
     filename = os.path.basename(file_path)
     extension = os.path.splitext(filename)[1].lower()
-
-    try:
-        if extension == ".pdf":
-
-            def read_pdf_content_sync(path: str) -> str:
-                pdf_text = ""
-                try:
-                    with open(path, "rb") as f_pdf:
-                        reader = PdfReader(f_pdf)
-                        if reader.is_encrypted:
-                            # Attempt to decrypt with an empty password, common for some PDFs
-                            # More robust decryption might require user input or specific passwords
-                            try:
-                                reader.decrypt("")
-                            except Exception:  # pylint: disable=broad-except
-                                # If decryption fails, proceed but text extraction might be limited/fail
-                                pass
-                        for page in reader.pages:
-                            page_text = page.extract_text()
-                            if page_text:
-                                pdf_text += page_text + "\n"
-                except Exception as e_pdf:  # pylint: disable=broad-except
-                    # Log or handle specific PDF reading errors if necessary
-                    # For now, if PyPDF2 fails, content might remain empty or partial
-                    print(f"Error reading PDF {path}: {e_pdf}")  # Basic logging
-                return pdf_text.strip()
-
-            content = await asyncio.to_thread(read_pdf_content_sync, file_path)
-            if not content:  # Check if content is empty after trying to read PDF
-                return {
-                    "status": "error",
-                    "error": f"No text content extracted from PDF: {filename}. The PDF might be image-based, encrypted, or corrupted.",
-                }
-
-        elif extension in [".txt", ".md"]:
-            async with aiofiles.open(
-                file_path, "r", encoding="utf-8", errors="ignore"
-            ) as f:
-                content = await f.read()
-        else:
-            return {
-                "status": "error",
-                "error": f"Unsupported file type: {extension}. Please upload .txt, .md, or .pdf files.",
-            }
-
-        if not content.strip():  # General check for empty content after reading
-            return {
-                "status": "error",
-                "error": f"No text content extracted from file: {filename}",
-            }
-
-        metadata = {
-            "source": filename,
-            "type": "document",
-            "extension": extension,
-            "path": file_path,
+    handler = _INGEST_HANDLERS.get(extension)
+    if handler is None:
+        return {
+            "status": "error",
+            "error": f"Unsupported file type: {extension}. Please upload .txt, .md, or .pdf files.",
         }
 
-        ingestion_result = await ingest_document.ainvoke(
-            {"content": content, "metadata": metadata}
-        )
-        return ingestion_result
+    metadata = {
+        "source": filename,
+        "type": "document",
+        "extension": extension,
+        "path": file_path,
+    }
 
+    try:
+        return await handler(file_path, metadata)
     except FileNotFoundError:
         return {"status": "error", "error": f"File not found: {file_path}"}
     except Exception as e:
@@ -149,20 +394,57 @@ async def ingest_file(file_path: str) -> Dict:
         }
 
 
+async def ingest_files(paths: List[str]) -> List[Dict]:
+    """Ingest several files concurrently, then finish the queued writes.
+
+    Args:
+        paths: File paths, or directories whose supported files are ingested
+
+    Returns:
+        The ingest_file result for each file, in order
+    """
+    file_paths: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            file_paths.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.lower().endswith(SUPPORTED_EXTENSIONS)
+            )
+        else:
+            file_paths.append(path)
+
+    try:
+        return await asyncio.gather(*(ingest_file(path) for path in file_paths))
+    finally:
+        await shutdown_ingestion()
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
-        description="Ingest a document into the RAG vector store."
+        description="Ingest documents into the RAG vector store."
     )
     parser.add_argument(
-        "file_path", type=str, help="Path to the document file to ingest."
+        "paths",
+        type=str,
+        nargs="+",
+        help="Paths to the document files, or directories of documents, to ingest.",
     )
     args = parser.parse_args()
-    result = asyncio.run(ingest_file(args.file_path))
+    settings.configure_event_loop()
+    results = asyncio.run(ingest_files(args.paths))
 
-    if result.get("status") == "success":
-        print(
-            f"Successfully ingested document: {result.get('metadata', {}).get('source', 'Unknown')}"
-        )
-        print(f"Number of chunks: {result.get('num_chunks', 0)}")
-    else:
-        print(f"Failed to ingest document: {result.get('error', 'Unknown error')}")
+    for result in results:
+        if result.get("status") == "success":
+            print(
+                f"Successfully ingested document: {result.get('metadata', {}).get('source', 'Unknown')}"
+            )
+            print(f"Number of chunks: {result.get('num_chunks', 0)}")
+        elif result.get("status") == "partial":
+            print(
+                f"Partially ingested document: {result.get('metadata', {}).get('source', 'Unknown')}"
+            )
+            print(f"Number of chunks: {result.get('num_chunks', 0)}")
+            print(f"Stopped early: {result.get('error', 'Unknown error')}")
+        else:
+            print(f"Failed to ingest document: {result.get('error', 'Unknown error')}")
@@ -1,17 +1,62 @@
 """File utility functions for the multi-agent system."""
 
+import asyncio
+import functools
+import io
+import multiprocessing
 import os
-from typing import Any, Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
-import PyPDF2
+import aiofiles
 import tiktoken
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-# Initialize tokenizer once
-_tokenizer = tiktoken.get_encoding("cl100k_base")
 
+@functools.lru_cache(maxsize=4)
+def get_encoding(name: str = "cl100k_base") -> tiktoken.Encoding:
+    """Get a tiktoken encoding, loaded on first use.
 
-async def count_tokens(text: str) -> int:
+    Processes that import this module without tokenizing, such as the PDF
+    extraction workers, never load the BPE tables.
+    """
+    return tiktoken.get_encoding(name)
+
+
+# Texts longer than this are tokenized in a worker thread by async callers
+OFFLOAD_THRESHOLD_CHARS = 200_000
+
+# PyMuPDF extracts PDF text in C and is much faster than PyPDF2 when installed
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+# Otherwise prefer pypdf, PyPDF2's maintained successor with faster extraction
+try:
+    from pypdf import PdfReader
+except ImportError:
+    from PyPDF2 import PdfReader
+
+# PDFs are extracted in parallel once each process would get this many pages
+PARALLEL_PDF_MIN_PAGES = 16
+
+# A PDF given by its path or by its contents
+PdfSource = Union[str, bytes]
+
+
+def count_tokens(text: str) -> int:
     """Count the number of tokens in a text using cl100k_base encoding.
 
     Args:
@@ -20,10 +65,31 @@ async def count_tokens(text: str) -> int:
     Returns:
         Number of tokens in the text
     """
-    return len(_tokenizer.encode(text))
+    return len(get_encoding().encode_ordinary(text))
+
+
+@functools.lru_cache(maxsize=8192)
+def _splitter_length(text: str) -> int:
+    """Count tokens for the text splitter, which measures the same pieces repeatedly."""
+    return len(get_encoding().encode_ordinary(text))
+
 
+@functools.lru_cache(maxsize=16)
+def _get_text_splitter(
+    chunk_size: int, chunk_overlap: int
+) -> RecursiveCharacterTextSplitter:
+    """Get the recursive splitter with token counting for the given chunk settings."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=_splitter_length,
+        separators=["\n\n", "\n", ".", "!", "?", " ", ""],  # Ordered by priority
+        keep_separator=True,  # Keep the separator with the chunk
+        is_separator_regex=False,  # Treat separators as literal strings
+    )
 
-async def create_chunks(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+
+def create_chunks(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
     """Split text into chunks using RecursiveCharacterTextSplitter with token counting.
 
     This function uses a hybrid approach that:
@@ -40,22 +106,251 @@ async def create_chunks(text: str, chunk_size: int, chunk_overlap: int) -> List[
     Returns:
         List of text chunks
     """
-    # Initialize the recursive splitter with token counting
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=lambda x: len(_tokenizer.encode(x)),
-        separators=["\n\n", "\n", ".", "!", "?", " ", ""],  # Ordered by priority
-        keep_separator=True,  # Keep the separator with the chunk
-        is_separator_regex=False,  # Treat separators as literal strings
-    )
+    # Text that fits in one chunk needs no splitting
+    if count_tokens(text) <= chunk_size:
+        text = text.strip()
+        return [text] if text else []
 
     # Split the text
-    chunks = text_splitter.split_text(text)
+    chunks = _get_text_splitter(chunk_size, chunk_overlap).split_text(text)
+
+    return chunks
+
+
+def create_chunks_header_aware(
+    text: str, chunk_size: int, chunk_overlap: int, header_offsets: List[int]
+) -> List[str]:
+    """Split text into chunks, preferring to break at markdown headers.
+
+    Consecutive sections are packed into a chunk while they fit in chunk_size.
+    Sections larger than chunk_size are split further with create_chunks.
+
+    Args:
+        text: Text to split into chunks
+        chunk_size: Target size for each chunk in tokens
+        chunk_overlap: Number of tokens to overlap when a section is split
+        header_offsets: Character offsets of the headers in text, ascending
+
+    Returns:
+        List of text chunks
+    """
+    bounds = [0, *(offset for offset in header_offsets if offset > 0), len(text)]
+    sections = [text[start:end] for start, end in zip(bounds, bounds[1:])]
+    section_tokens = [
+        len(ids)
+        for ids in get_encoding().encode_ordinary_batch(
+            sections, num_threads=os.cpu_count() or 1
+        )
+    ]
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush() -> None:
+        nonlocal current_tokens
+        chunk = "".join(current).strip()
+        if chunk:
+            chunks.append(chunk)
+        current.clear()
+        current_tokens = 0
+
+    for section, tokens in zip(sections, section_tokens):
+        if tokens > chunk_size:
+            flush()
+            chunks.extend(create_chunks(section, chunk_size, chunk_overlap))
+            continue
+        if current and current_tokens + tokens > chunk_size:
+            flush()
+        current.append(section)
+        current_tokens += tokens
+    flush()
 
     return chunks
 
 
+def create_chunks_with_stats(
+    text: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    header_offsets: Optional[List[int]] = None,
+) -> Tuple[List[str], List[int], int]:
+    """Split text into chunks and report token counts alongside them.
+
+    Args:
+        text: Text to split into chunks
+        chunk_size: Target size for each chunk in tokens
+        chunk_overlap: Number of tokens to overlap between chunks
+        header_offsets: Optional header offsets to split at, see create_chunks_header_aware
+
+    Returns:
+        Tuple of (chunks, token count per chunk, total tokens in the text)
+    """
+    if header_offsets:
+        chunks = create_chunks_header_aware(
+            text, chunk_size, chunk_overlap, header_offsets
+        )
+    else:
+        chunks = create_chunks(text, chunk_size, chunk_overlap)
+    chunk_token_counts = [
+        len(ids)
+        for ids in get_encoding().encode_ordinary_batch(
+            chunks, num_threads=os.cpu_count() or 1
+        )
+    ]
+    total_tokens = len(get_encoding().encode_ordinary(text))
+    return chunks, chunk_token_counts, total_tokens
+
+
+def _open_pdf(source: PdfSource) -> Any:
+    """Open a PDF path or PDF bytes with PyMuPDF."""
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def _open_pdf_reader(source: PdfSource) -> PdfReader:
+    """Open a PDF for extraction, decrypting it with an empty password if needed."""
+    reader = PdfReader(
+        io.BytesIO(source) if isinstance(source, bytes) else source, strict=False
+    )
+    if reader.is_encrypted:
+        # Attempt to decrypt with an empty password, common for some PDFs
+        try:
+            reader.decrypt("")
+        except Exception:  # pylint: disable=broad-except
+            # If decryption fails, proceed but text extraction might be limited/fail
+            pass
+    return reader
+
+
+def count_pdf_pages(source: PdfSource) -> int:
+    """Count the pages of a PDF, given its path or contents."""
+    if fitz is not None:
+        with _open_pdf(source) as doc:
+            return len(doc)
+    return len(_open_pdf_reader(source).pages)
+
+
+def extract_pdf_text(
+    source: PdfSource, start: int = 0, stop: Optional[int] = None
+) -> str:
+    """Extract the text of a PDF, one line break after each page with text.
+
+    Uses PyMuPDF when installed and falls back to pypdf or PyPDF2 otherwise.
+
+    Args:
+        source: Path to the PDF file, or its contents
+        start: Index of the first page to extract
+        stop: Index after the last page to extract, or None for the last page
+
+    Returns:
+        The extracted text, stripped of surrounding whitespace
+    """
+    page_texts: List[str] = []
+    if fitz is not None:
+        with _open_pdf(source) as doc:
+            for page in doc.pages(start, stop):
+                page_text = page.get_text("text")
+                if page_text:
+                    page_texts.append(page_text)
+    else:
+        for page in _open_pdf_reader(source).pages[start:stop]:
+            page_text = page.extract_text()
+            if page_text:
+                page_texts.append(page_text)
+    return "\n".join(page_texts).strip()
+
+
+# Created on first parallel extraction and closed by shutdown_pdf_process_pool
+_pdf_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pdf_process_pool() -> ProcessPoolExecutor:
+    """Get the process pool shared by parallel PDF extractions."""
+    global _pdf_process_pool
+
+    if _pdf_process_pool is None:
+        # The server process already runs threads, which fork could copy
+        # mid-lock into the workers, so start them from a clean forkserver
+        _pdf_process_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _pdf_process_pool
+
+
+def shutdown_pdf_process_pool() -> None:
+    """Stop the PDF extraction workers, if any were started."""
+    global _pdf_process_pool
+
+    if _pdf_process_pool is not None:
+        _pdf_process_pool.shutdown(cancel_futures=True)
+        _pdf_process_pool = None
+
+
+async def iter_pdf_text(path: str) -> AsyncIterator[str]:
+    """Yield the text of a PDF page range by page range, in page order.
+
+    PDFs with at least PARALLEL_PDF_MIN_PAGES pages per worker are split into
+    ranges extracted in separate processes, since extraction holds the GIL.
+    Each range is yielded as soon as it and the ranges before it are done.
+    Smaller PDFs are extracted in one worker thread and yielded whole.
+
+    Args:
+        path: Path to the PDF file
+
+    Yields:
+        The text of each page range, as returned by extract_pdf_text
+    """
+    # Read without holding a worker thread, then parse from memory
+    async with aiofiles.open(path, "rb") as f:
+        data = await f.read()
+
+    num_pages = await asyncio.to_thread(count_pdf_pages, data)
+    workers = min(os.cpu_count() or 1, num_pages // PARALLEL_PDF_MIN_PAGES)
+    if workers < 2:
+        yield await asyncio.to_thread(extract_pdf_text, data)
+        return
+
+    # Each worker reopens the file rather than receiving a copy of its contents
+    loop = asyncio.get_running_loop()
+    pool = _get_pdf_process_pool()
+    step = -(-num_pages // workers)
+    parts = [
+        loop.run_in_executor(
+            pool, extract_pdf_text, path, start, min(start + step, num_pages)
+        )
+        for start in range(0, num_pages, step)
+    ]
+    for part in parts:
+        yield await part
+
+
+async def read_pdf_text(path: str) -> str:
+    """Extract the text of a PDF without blocking the event loop.
+
+    Args:
+        path: Path to the PDF file
+
+    Returns:
+        The extracted text, with a line break between page ranges
+    """
+    return "\n".join([part async for part in iter_pdf_text(path) if part])
+
+
+async def _read_text_file(path: str) -> str:
+    """Read a UTF-8 text file in a worker thread."""
+    return await asyncio.to_thread(Path(path).read_text, encoding="utf-8")
+
+
+# Content readers for read_file, by lowercase file extension
+_READERS: Dict[str, Callable[[str], Awaitable[str]]] = {
+    ".pdf": read_pdf_text,
+    **dict.fromkeys([".txt", ".md", ".py", ".json", ".yaml", ".yml"], _read_text_file),
+}
+
+
 async def read_file(file_path: str) -> Dict[str, Any]:
     """Read file content and return with metadata.
 
@@ -83,39 +378,16 @@ async def read_file(file_path: str) -> Dict[str, Any]:
             }
 
         file_extension = os.path.splitext(safe_file_name)[1].lower()
-        content = ""
-
-        if file_extension == ".pdf":
-            try:
-                with open(full_path, "rb") as f:
-                    reader = PyPDF2.PdfReader(f)
-                    for page_num in range(len(reader.pages)):
-                        page = reader.pages[page_num]
-                        content += (
-                            page.extract_text() or ""
-                        )  # Add empty string if extract_text is None
-            except ImportError:
-                return {
-                    "error": "PyPDF2 is not installed. Cannot process PDF files.",
-                    "content": "",
-                    "metadata": {},
-                }
-            except Exception as e:
-                return {
-                    "error": f"Error reading PDF file {safe_file_name}: {str(e)}",
-                    "content": "",
-                    "metadata": {},
-                }
-        elif file_extension in [".txt", ".md", ".py", ".json", ".yaml", ".yml"]:
-            with open(full_path, "r", encoding="utf-8") as f:
-                content = f.read()
-        else:
+        reader = _READERS.get(file_extension)
+        if reader is None:
             return {
                 "error": f"Unsupported file type: {file_extension}",
                 "content": "",
                 "metadata": {"source": safe_file_name, "extension": file_extension},
             }
 
+        content = await reader(full_path)
+
         return {
             "content": content,
             "metadata": {
@@ -7,6 +7,9 @@ from langchain_core.messages import HumanMessage
 # Number of recent messages to keep for context
 RECENT_MESSAGES_COUNT = 3
 
+# Runs of newlines collapsed in formatted history
+_NEWLINE_RE = re.compile(r"\n+")
+
 
 def get_recent_messages(messages: List[Any], exclude_last: bool = False) -> List[Any]:
     """Get the most recent messages for context.
@@ -18,15 +21,8 @@ def get_recent_messages(messages: List[Any], exclude_last: bool = False) -> List
     Returns:
         List of recent messages, optionally excluding the last one
     """
-    if not messages:
-        return []
-
-    recent = (
-        messages[-RECENT_MESSAGES_COUNT:]
-        if len(messages) > RECENT_MESSAGES_COUNT
-        else messages
-    )
-    return recent[:-1] if exclude_last else recent
+    # A single slice copies only the kept messages
+    return messages[-RECENT_MESSAGES_COUNT : -1 if exclude_last else None]
 
 
 def format_conversation_history(messages: List[Any]) -> str:
@@ -41,6 +37,8 @@ def format_conversation_history(messages: List[Any]) -> str:
     formatted_messages = []
     for msg in messages:
         prefix = "USER" if isinstance(msg, HumanMessage) else "ASSISTANT"
-        clean_content = re.sub(r"\n+", "\n", msg.content.strip())
+        clean_content = msg.content.strip()
+        if "\n\n" in clean_content:
+            clean_content = _NEWLINE_RE.sub("\n", clean_content)
         formatted_messages.append(f"{prefix}: {clean_content}")
     return "\n".join(formatted_messages)
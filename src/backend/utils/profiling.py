@@ -0,0 +1,35 @@
+"""Per-node timing and token accounting for graph nodes."""
+
+import functools
+import logging
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+from langchain_community.callbacks import get_openai_callback
+
+T = TypeVar("T")
+
+
+def timed_node(
+    func: Callable[..., Awaitable[T]],
+) -> Callable[..., Awaitable[T]]:
+    """Decorate an async graph node to log each execution's time and token usage.
+
+    Executions are logged at debug level.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        start = time.perf_counter()
+        with get_openai_callback() as usage:
+            result = await func(*args, **kwargs)
+        logging.debug(
+            "Node %s took %.1f ms (%d input tokens, %d output tokens)",
+            func.__name__,
+            (time.perf_counter() - start) * 1000,
+            usage.prompt_tokens,
+            usage.completion_tokens,
+        )
+        return result
+
+    return wrapper
@@ -224,9 +224,9 @@ function appendMessage(role, content, displayContentOverride = null) {
             </div>
         `;
     } else if (role === 'tool_message') {
-        // Parse the tool message content (actual content, not displayContent)
+        // Streamed tool messages arrive parsed; stored ones carry JSON content
         try {
-            const toolData = JSON.parse(content);
+            const toolData = typeof content === 'string' ? JSON.parse(content) : content;
             const isToolCall = toolData.type === 'tool_call';
             const isToolCombined = toolData.type === 'tool_combined';
 
@@ -388,6 +388,7 @@ async function processMessageQueue() {
         const decoder = new TextDecoder();
         let currentAssistantMessage = '';
         let hasStartedReceivingResponse = false;
+        let buffer = '';
 
         while (true) {
             const { value, done } = await reader.read();
@@ -399,10 +400,18 @@ async function processMessageQueue() {
                 hasStartedReceivingResponse = true;
             }
 
-            const chunk = decoder.decode(value);
-            const events = chunk.split('\n\n').filter(Boolean);
+            // Events can be split across reads, so only parse up to the
+            // last complete one and keep the remainder for the next read
+            buffer += decoder.decode(value, { stream: true });
+            const boundary = buffer.lastIndexOf('\n\n');
+            if (boundary === -1) continue;
+            const events = buffer.slice(0, boundary).split('\n\n').filter(Boolean);
+            buffer = buffer.slice(boundary + 2);
 
             for (const eventText of events) {
+                // Skip keep-alive comments
+                if (eventText.startsWith(':')) continue;
+
                 const eventLines = eventText.split('\n');
                 const eventType = eventLines[0].slice(7);
                 const data = eventLines[1].slice(6);
@@ -418,7 +427,7 @@ async function processMessageQueue() {
                                 appendMessage('assistant', currentAssistantMessage);
                                 currentAssistantMessage = '';
                             }
-                            appendMessage('tool_message', content);
+                            appendMessage('tool_message', messageData);
                             scrollToBottom(); // Scroll after tool message
                         } else if (role === 'assistant') {
                             // Add space if needed between numbers and text
@@ -1025,7 +1034,7 @@ async function handleDocumentUpload() {
     const formData = new FormData();
     formData.append('file', file);
 
-    uploadStatus.textContent = 'Uploading and processing...';
+    uploadStatus.textContent = 'Uploading...';
     uploadStatus.className = 'upload-status-message loading';
 
     try {
@@ -1036,8 +1045,8 @@ async function handleDocumentUpload() {
 
         const result = await response.json();
 
-        if (response.ok && result.status === 'success') {
-            uploadStatus.textContent = `Success: ${file.name} ingested (${result.num_chunks} chunks).`;
+        if (response.ok && result.status === 'queued') {
+            uploadStatus.textContent = `Uploaded: ${file.name} is being ingested in the background.`;
             uploadStatus.className = 'upload-status-message success';
             fileInput.value = ''; // Clear the file input
         } else {